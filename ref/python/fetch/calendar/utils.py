@@ -8,13 +8,18 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict
 
-import yaml
+
+_LOGGERS: Dict[str, tuple[Path, logging.Logger]] = {}
 
 
 def load_config(path: str) -> Dict[str, Any]:
+    import yaml  # import ตอนใช้จริง (ไม่ถ่วง startup ของ script ที่ไม่ได้อ่าน config)
+
     load_env_file(Path(path).resolve().parent)
-    with open(path, "r", encoding="utf-8") as f:
-        cfg = yaml.safe_load(f)
+    # libyaml (C) loader ถ้า PyYAML build มาพร้อม libyaml; ไม่งั้นใช้ SafeLoader ปกติ
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(path, "rb") as f:
+        cfg = yaml.load(f, Loader=loader)
     return apply_env_overrides(cfg)
 
 
@@ -61,24 +66,35 @@ def utc_now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
 
 
-def atomic_write_text(path: Path, text: str) -> None:
+def atomic_write_text(path: Path, text: str, fsync: bool = False) -> None:
+    # encode ครั้งเดียวแล้ว write ก้อนเดียว (unbuffered); fsync เฉพาะไฟล์ที่ต้องการ durability เช่น manifest
     tmp = path.with_suffix(path.suffix + ".tmp")
-    tmp.write_text(text, encoding="utf-8")
-    tmp.replace(path)
+    with open(tmp, "wb", buffering=0) as f:
+        f.write(text.encode("utf-8"))
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
 
 
-def atomic_write_json(path: Path, payload: Dict[str, Any]) -> None:
+def atomic_write_json(path: Path, payload: Dict[str, Any], fsync: bool = False) -> None:
     text = json.dumps(payload, ensure_ascii=False, indent=2)
-    atomic_write_text(path, text)
+    atomic_write_text(path, text, fsync=fsync)
 
 
 def setup_logger(logs_dir: Path, name: str = "fetch_calendar") -> logging.Logger:
+    log_file = Path(logs_dir).resolve() / f"{name}_{datetime.now().strftime('%Y%m%d')}.log"
+    cached = _LOGGERS.get(name)
+    if cached is not None and cached[0] == log_file:
+        return cached[1]
+
     ensure_dir(logs_dir)
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
+    for handler in logger.handlers:
+        handler.close()
     logger.handlers.clear()
+    logger.propagate = False
 
-    log_file = logs_dir / f"{name}_{datetime.now().strftime('%Y%m%d')}.log"
     fh = logging.FileHandler(log_file, encoding="utf-8")
     fh.setLevel(logging.INFO)
 
@@ -91,6 +107,7 @@ def setup_logger(logs_dir: Path, name: str = "fetch_calendar") -> logging.Logger
 
     logger.addHandler(fh)
     logger.addHandler(sh)
+    _LOGGERS[name] = (log_file, logger)
     return logger
 
 
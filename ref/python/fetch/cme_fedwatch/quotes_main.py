@@ -5,12 +5,23 @@ import json
 import os
 import sys
 import getpass
+import io
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from functools import lru_cache
 from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
+from types import MappingProxyType
+from typing import Iterable, Mapping
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback to stdlib json
+    orjson = None
+
 BASE_DIR = Path(__file__).resolve().parent
 PYTHON_DIR = BASE_DIR.parents[2].resolve()
 REPO_ROOT = PYTHON_DIR.parent
@@ -30,7 +41,17 @@ DEFAULT_WATCHLIST_FILTERS = {
     "weekly": {"zq": 6, "sr1": 3, "sr3": 3, "zn": 2, "6e": 1, "zt": 1, "zf": 1, "zb": 1},
     "monthly": {"zq": 12, "sr1": 6, "sr3": 6, "zn": 3, "tn": 2, "zb": 2, "ub": 2, "twe": 1, "6e": 1, "e7": 1, "m6e": 1},
 }
+# read-only copy ใช้ตอน config ไม่ได้ override watchlist_filters (กรณีปกติ)
+_DEFAULT_WATCHLIST_FILTERS_FROZEN = MappingProxyType({
+    bucket: MappingProxyType(dict(prefixes))
+    for bucket, prefixes in DEFAULT_WATCHLIST_FILTERS.items()
+})
 NAV_TIMEOUT = 60_000
+DEFAULT_PAGE_TIMEOUT = 5_000
+LOGIN_RESPONSE_TIMEOUT = 8_000
+DEBUG_CAPTURE_TIMEOUT = 30_000
+AUTH_FORM_WAIT_TIMEOUT = 1_200
+AUTH_TEXT_MARKERS = ("AUTHENTICATED", "LOGIN_REQUIRED", "UNAUTHORIZED", "EXPIRED")
 MONTH_ALIASES = {
     "JAN": 1,
     "FEB": 2,
@@ -45,6 +66,109 @@ MONTH_ALIASES = {
     "NOV": 11,
     "DEC": 12,
 }
+_EXPIRY_SEPARATORS = str.maketrans("/-", "  ")
+
+_EXTRACT_WATCHLIST_JS = """(sel) => {
+    const table = document.querySelector(sel);
+    if (!table) return null;
+
+    if (table.classList.contains('watchlist-table')) {
+        const headers = [
+            'Name',
+            'Code',
+            'Expiry',
+            'Chart URL',
+            'Last Price',
+            'Change',
+            'High',
+            'Low',
+            'Open',
+            'Volume',
+            'Contract Code',
+            'Front Month',
+            'Product URL',
+        ];
+
+        const rows = Array.from(table.querySelectorAll('.tbody .tr')).map(row => {
+            const nameCell = row.querySelector('.first-column .table-cell.month-code');
+            let name = '';
+            let code = '';
+            if (nameCell) {
+                const lines = nameCell.innerText
+                    .split('\\n')
+                    .map(line => line.trim())
+                    .filter(Boolean);
+                if (lines.length > 0) name = lines[0];
+                if (lines.length > 1) code = lines[lines.length - 1];
+            }
+
+            const codeAnchor = row.querySelector('.first-column a.code');
+            if (codeAnchor && codeAnchor.innerText.trim()) {
+                code = codeAnchor.innerText.trim();
+            }
+            const productUrl = codeAnchor ? codeAnchor.href : '';
+
+            const expiryCell = row.querySelector('.second-column .expiration-month');
+            let expiry = expiryCell ? expiryCell.innerText.trim() : '';
+            if (expiry) {
+                expiry = expiry.replace(/^FM\\b[\\s\\n]*/i, '').trim();
+            }
+
+            const contractInput = row.querySelector('input[data-contract-code]');
+            const contractCode = contractInput
+                ? contractInput.getAttribute('data-contract-code') || ''
+                : '';
+            const isFrontMonth = contractInput
+                ? (contractInput.getAttribute('data-is-front-month') === 'true')
+                : false;
+
+            const chartAnchor = row.querySelector('.third-column a[data-code]');
+            const chartUrl = chartAnchor ? chartAnchor.href : '';
+
+            const valueCells = Array.from(
+                row.querySelectorAll('.third-column .table-cell')
+            ).map(cell => cell.innerText.trim());
+
+            const lastPrice = valueCells[1] || '';
+            const change = valueCells[2] || '';
+            const high = valueCells[3] || '';
+            const low = valueCells[4] || '';
+            const open = valueCells[5] || '';
+            const volume = valueCells[6] || '';
+
+            return [
+                name,
+                code,
+                expiry,
+                chartUrl,
+                lastPrice,
+                change,
+                high,
+                low,
+                open,
+                volume,
+                contractCode,
+                isFrontMonth ? 'true' : 'false',
+                productUrl,
+            ];
+        });
+
+        return JSON.stringify({ headers, rows });
+    }
+
+    const headers = Array.from(table.querySelectorAll('thead th'))
+        .map(th => th.innerText.trim())
+        .filter(Boolean);
+    const rows = Array.from(table.querySelectorAll('tbody tr')).map(tr => {
+        return Array.from(tr.querySelectorAll('th, td'))
+            .map(td => td.innerText.trim());
+    });
+    return JSON.stringify({ headers, rows });
+}"""
+# ติดตั้งครั้งเดียวต่อ context (add_init_script) แล้ว evaluate ส่งแค่ selector
+_EXTRACT_WATCHLIST_INSTALLER = "window.__extractWatchlist = " + _EXTRACT_WATCHLIST_JS + ";"
+# ใช้ตัวที่ add_init_script ติดตั้งไว้; ถ้า page ไม่ได้ navigate หลังติดตั้งก็ fallback เป็น inline ใน call เดียวกัน
+_EXTRACT_WATCHLIST_CALL = "(sel) => (window.__extractWatchlist || (" + _EXTRACT_WATCHLIST_JS + "))(sel)"
 
 class AuthState(str, Enum):
     AUTHENTICATED = "AUTHENTICATED"
@@ -115,10 +239,13 @@ def notify_telegram(cfg: dict, message: str, logger: logging.Logger) -> None:
         logger.info("Telegram notify finished")
 
 
-def queue_telegram(messages: list[str], message: str, logger: logging.Logger | None = None) -> None:
+def queue_telegram(messages: io.StringIO, message: str, logger: logging.Logger | None = None) -> None:
     if logger:
         logger.info("Telegram queue: %s", message)
-    messages.append(message)
+    # เขียนต่อท้าย buffer ตรง ๆ คั่นด้วยบรรทัดว่าง แทนการเก็บ list แล้ว join ตอนท้าย
+    if messages.tell():
+        messages.write("\n\n")
+    messages.write(message)
 
 
 def format_filtered_counts(counts: dict[str, int]) -> str:
@@ -211,16 +338,36 @@ def detect_state(page, response_text: str | None = None) -> AuthState:
     # ยังไงก็ไม่น่า UNKNOWN มาก แต่เผื่อไว้
     return AuthState.AUTHENTICATED
 
+def goto_auth_url(page, auth_url: str) -> str | None:
+    response = page.goto(auth_url, wait_until="domcontentloaded", timeout=NAV_TIMEOUT)
+    response_text = None
+    if response is not None:
+        try:
+            response_text = response.text()
+        except Exception:
+            response_text = None
+
+    # auth endpoint ตอบเป็น text marker -> detect_state ตัดสินจาก text ได้เลย ไม่ต้องรอ DOM
+    text_upper = (response_text or "").upper()
+    if any(marker in text_upper for marker in AUTH_TEXT_MARKERS):
+        return response_text
+
+    # ไม่มี marker: รอ login form แทน sleep ตายตัว (cap เท่า sleep เดิม 1.2s)
+    try:
+        page.wait_for_selector("#user", state="attached", timeout=AUTH_FORM_WAIT_TIMEOUT)
+    except PlaywrightTimeoutError:
+        pass
+    return response_text
+
 def save_debug(page, prefix="debug"):
     try:
-        page.screenshot(path=f"{prefix}.png", full_page=True)
+        # timeout แยกจาก default ของ page (5s) เพราะ full-page screenshot อาจช้ากว่า
+        page.screenshot(path=f"{prefix}.png", full_page=True, timeout=DEBUG_CAPTURE_TIMEOUT)
         print(f"📸 saved: {prefix}.png")
     except:
         pass
     try:
-        html = page.content()
-        with open(f"{prefix}.html", "w", encoding="utf-8") as f:
-            f.write(html)
+        Path(f"{prefix}.html").write_text(page.content(), encoding="utf-8")
         print(f"🧾 saved: {prefix}.html")
     except:
         pass
@@ -251,10 +398,16 @@ def resolve_output_paths(cfg: dict) -> dict[str, Path]:
         "csv_output": csv_output,
     }
 
-def build_timestamp() -> tuple[str, str]:
-    now = datetime.now()
+def build_timestamp(now: datetime | None = None) -> tuple[str, str]:
+    if now is None:
+        now = datetime.now()
     return now.strftime("%Y%m%d_%H%M%S"), now.isoformat(timespec="seconds")
 
+def dump_json_bytes(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+
 def append_timestamp_to_path(path: Path, timestamp: str) -> Path:
     return path.with_name(f"{path.stem}_{timestamp}{path.suffix}")
 
@@ -274,7 +427,8 @@ def fetch_watchlist_html(page, cfg: dict) -> dict[str, str | int] | None:
     output_path = outputs["html_output"]
     json_output = outputs["json_output"]
     csv_output = outputs["csv_output"]
-    timestamp, timestamp_iso = build_timestamp()
+    run_now = datetime.now()
+    timestamp, timestamp_iso = build_timestamp(run_now)
     json_output = append_timestamp_to_path(json_output, timestamp)
 
     try:
@@ -313,6 +467,7 @@ def fetch_watchlist_html(page, cfg: dict) -> dict[str, str | int] | None:
                     timestamp,
                     timestamp_iso,
                     filters,
+                    now=run_now,
                 )
             row_count = len(filtered_rows)
         else:
@@ -326,8 +481,7 @@ def fetch_watchlist_html(page, cfg: dict) -> dict[str, str | int] | None:
         return None
 
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(html)
+        output_path.write_text(html, encoding="utf-8")
         print(f"✅ saved watchlist html: {output_path}")
     except Exception as exc:
         print(f"❌ write watchlist HTML failed: {exc}")
@@ -349,106 +503,9 @@ def extract_watchlist_table(page) -> tuple[list[str], list[list[str]]] | None:
             page.wait_for_selector(selector, timeout=10_000)
         except PlaywrightTimeoutError:
             continue
-        table_data = page.evaluate(
-            """(sel) => {
-                const table = document.querySelector(sel);
-                if (!table) return null;
-
-                if (table.classList.contains('watchlist-table')) {
-                    const headers = [
-                        'Name',
-                        'Code',
-                        'Expiry',
-                        'Chart URL',
-                        'Last Price',
-                        'Change',
-                        'High',
-                        'Low',
-                        'Open',
-                        'Volume',
-                        'Contract Code',
-                        'Front Month',
-                        'Product URL',
-                    ];
-
-                    const rows = Array.from(table.querySelectorAll('.tbody .tr')).map(row => {
-                        const nameCell = row.querySelector('.first-column .table-cell.month-code');
-                        let name = '';
-                        let code = '';
-                        if (nameCell) {
-                            const lines = nameCell.innerText
-                                .split('\\n')
-                                .map(line => line.trim())
-                                .filter(Boolean);
-                            if (lines.length > 0) name = lines[0];
-                            if (lines.length > 1) code = lines[lines.length - 1];
-                        }
-
-                        const codeAnchor = row.querySelector('.first-column a.code');
-                        if (codeAnchor && codeAnchor.innerText.trim()) {
-                            code = codeAnchor.innerText.trim();
-                        }
-                        const productUrl = codeAnchor ? codeAnchor.href : '';
-
-                        const expiryCell = row.querySelector('.second-column .expiration-month');
-                        let expiry = expiryCell ? expiryCell.innerText.trim() : '';
-                        if (expiry) {
-                            expiry = expiry.replace(/^FM\\b[\\s\\n]*/i, '').trim();
-                        }
-
-                        const contractInput = row.querySelector('input[data-contract-code]');
-                        const contractCode = contractInput
-                            ? contractInput.getAttribute('data-contract-code') || ''
-                            : '';
-                        const isFrontMonth = contractInput
-                            ? (contractInput.getAttribute('data-is-front-month') === 'true')
-                            : false;
-
-                        const chartAnchor = row.querySelector('.third-column a[data-code]');
-                        const chartUrl = chartAnchor ? chartAnchor.href : '';
-
-                        const valueCells = Array.from(
-                            row.querySelectorAll('.third-column .table-cell')
-                        ).map(cell => cell.innerText.trim());
-
-                        const lastPrice = valueCells[1] || '';
-                        const change = valueCells[2] || '';
-                        const high = valueCells[3] || '';
-                        const low = valueCells[4] || '';
-                        const open = valueCells[5] || '';
-                        const volume = valueCells[6] || '';
-
-                        return [
-                            name,
-                            code,
-                            expiry,
-                            chartUrl,
-                            lastPrice,
-                            change,
-                            high,
-                            low,
-                            open,
-                            volume,
-                            contractCode,
-                            isFrontMonth ? 'true' : 'false',
-                            productUrl,
-                        ];
-                    });
-
-                    return { headers, rows };
-                }
-
-                const headers = Array.from(table.querySelectorAll('thead th'))
-                    .map(th => th.innerText.trim())
-                    .filter(Boolean);
-                const rows = Array.from(table.querySelectorAll('tbody tr')).map(tr => {
-                    return Array.from(tr.querySelectorAll('th, td'))
-                        .map(td => td.innerText.trim());
-                });
-                return { headers, rows };
-            }""",
-            selector,
-        )
+        raw_table = page.evaluate(_EXTRACT_WATCHLIST_CALL, selector)
+        # JS ส่งกลับเป็น JSON string ก้อนเดียว ลดการ serialize ทีละ cell ผ่าน CDP
+        table_data = json.loads(raw_table) if raw_table else None
         if table_data and table_data.get("rows"):
             headers = table_data.get("headers") or []
             rows = table_data.get("rows") or []
@@ -473,15 +530,16 @@ def resolve_max_expiry_year(cfg: dict) -> int | None:
 def parse_expiry_year(expiry: str) -> int | None:
     if not expiry:
         return None
-    for token in expiry.replace("/", " ").replace("-", " ").split():
+    for token in expiry.translate(_EXPIRY_SEPARATORS).split():
         if token.isdigit() and len(token) == 4:
             return int(token)
     return None
 
+@lru_cache(maxsize=512)
 def parse_expiry_month_year(expiry: str) -> tuple[int | None, int | None]:
     if not expiry:
         return None, None
-    tokens = expiry.replace("/", " ").replace("-", " ").split()
+    tokens = expiry.translate(_EXPIRY_SEPARATORS).split()
     month_value = None
     year_value = None
     for token in tokens:
@@ -501,6 +559,7 @@ def parse_expiry_month_year(expiry: str) -> tuple[int | None, int | None]:
                     month_value = numeric
     return year_value, month_value
 
+@lru_cache(maxsize=512)
 def normalize_expiry_value(expiry: str) -> str:
     if not expiry:
         return expiry
@@ -516,14 +575,23 @@ def expiry_month_distance(expiry: str, now: datetime) -> int | None:
     return (year - now.year) * 12 + (month - now.month)
 
 def normalize_expiry_in_item(item: dict) -> dict:
-    expiry_keys = [key for key in item.keys() if str(key).strip().lower() == "expiry"]
-    if not expiry_keys:
-        return item
-    updated = dict(item)
-    for key in expiry_keys:
-        updated[key] = normalize_expiry_value(str(item.get(key, "")))
+    # copy เฉพาะเมื่อค่าเปลี่ยนจริง (item อาจถูกแชร์ข้าม bucket ห้าม mutate ตรงๆ)
+    updated = item
+    for key, value in item.items():
+        if key != "Expiry" and str(key).strip().lower() != "expiry":
+            continue
+        normalized = normalize_expiry_value(str(value))
+        if normalized == value:
+            continue
+        if updated is item:
+            updated = dict(item)
+        updated[key] = normalized
     return updated
 
+@lru_cache(maxsize=16)
+def _header_index(headers: tuple[str, ...]) -> dict[str, int]:
+    return {header.strip().lower(): idx for idx, header in enumerate(headers)}
+
 def filter_watchlist_rows(
     headers: list[str],
     rows: list[list[str]],
@@ -532,7 +600,7 @@ def filter_watchlist_rows(
     if not headers:
         return rows
 
-    header_map = {header.strip().lower(): idx for idx, header in enumerate(headers)}
+    header_map = _header_index(tuple(headers))
     last_price_idx = header_map.get("last price")
     volume_idx = header_map.get("volume")
     expiry_idx = header_map.get("expiry")
@@ -567,10 +635,21 @@ def prune_watchlist_columns(
         return headers, rows
 
     pruned_headers = [headers[idx] for idx in keep_indices]
-    pruned_rows = [
-        [row[idx] if idx < len(row) else "" for idx in keep_indices]
+    if not keep_indices:
+        return pruned_headers, [[] for _ in rows]
+
+    # pad สั้นก่อน แล้วดึงทุก column ด้วย itemgetter ทีเดียวต่อ row
+    max_idx = max(keep_indices)
+    padded_rows = (
+        row if len(row) > max_idx else row + [""] * (max_idx + 1 - len(row))
         for row in rows
-    ]
+    )
+    if len(keep_indices) == 1:
+        only_idx = keep_indices[0]
+        pruned_rows = [[row[only_idx]] for row in padded_rows]
+    else:
+        getter = itemgetter(*keep_indices)
+        pruned_rows = [list(values) for values in map(getter, padded_rows)]
     return pruned_headers, pruned_rows
 
 def save_table_as_json(
@@ -589,8 +668,8 @@ def save_table_as_json(
 
     try:
         payload = add_timestamp_to_payload(payload, timestamp_iso)
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
+        with open(output_path, "wb") as f:
+            f.write(dump_json_bytes(payload))
         print(f"✅ saved watchlist json: {output_path}")
     except Exception as exc:
         print(f"❌ write watchlist json failed: {exc}")
@@ -628,40 +707,72 @@ def extract_code_from_item(item: dict) -> str:
             return str(value).strip()
     return ""
 
+def extract_codes_lower(payload: list[dict]) -> list[str]:
+    return [extract_code_from_item(item).lower() for item in payload]
+
+def expiry_distance_key(item: dict, now: datetime) -> tuple[int, int]:
+    distance = expiry_month_distance(str(item.get("Expiry", "")), now)
+    if distance is None:
+        return (1, 9999)
+    return (0 if distance >= 0 else 1, abs(distance))
+
+def build_distance_keys(payload: list[dict], now: datetime) -> list[tuple[int, int]]:
+    return [expiry_distance_key(item, now) for item in payload]
+
+def group_candidates_by_prefix(
+    payload: list[dict],
+    prefixes: Iterable[str],
+    codes: list[str],
+    distance_keys: list[tuple[int, int]],
+) -> dict[str, list[tuple[tuple[int, int], dict]]]:
+    # จัดกลุ่ม item ตาม prefix ในรอบเดียว (hash lookup ตามความยาว prefix) แทนการ scan payload ทุก prefix
+    grouped: dict[str, list[tuple[tuple[int, int], dict]]] = {prefix.lower(): [] for prefix in prefixes}
+    lengths = sorted({len(prefix) for prefix in grouped})
+    for code, distance_key, item in zip(codes, distance_keys, payload):
+        if not code:
+            continue
+        for length in lengths:
+            if length > len(code):
+                break
+            candidates = grouped.get(code[:length])
+            if candidates is not None:
+                candidates.append((distance_key, item))
+    for candidates in grouped.values():
+        candidates.sort(key=lambda entry: entry[0])
+    return grouped
+
+def _dedup_key(item: dict) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted(
+        (str(k), "" if v is None else str(v))
+        for k, v in item.items()
+        if k != "Front Month"
+    ))
+
 def filter_watchlist_by_prefix_limits(
     payload: list[dict],
-    prefixes: dict[str, int | None],
+    prefixes: Mapping[str, int | None],
     now: datetime,
+    codes: list[str] | None = None,
+    distance_keys: list[tuple[int, int]] | None = None,
+    grouped: dict[str, list[tuple[tuple[int, int], dict]]] | None = None,
 ) -> list[dict]:
     selected: list[dict] = []
     seen_keys: set[tuple[tuple[str, str], ...]] = set()
+    if grouped is None:
+        if codes is None:
+            codes = extract_codes_lower(payload)
+        if distance_keys is None:
+            distance_keys = build_distance_keys(payload, now)
+        grouped = group_candidates_by_prefix(payload, prefixes, codes, distance_keys)
 
     for prefix, limit in prefixes.items():
-        normalized_prefix = prefix.lower()
-        candidates = []
-        for item in payload:
-            code = extract_code_from_item(item).lower()
-            if not code or not code.startswith(normalized_prefix):
-                continue
-            distance = expiry_month_distance(str(item.get("Expiry", "")), now)
-            if distance is None:
-                distance_key = (1, 9999)
-            else:
-                distance_key = (0 if distance >= 0 else 1, abs(distance))
-            candidates.append((distance_key, item))
-
-        candidates.sort(key=lambda entry: entry[0])
+        candidates = grouped.get(prefix.lower(), [])
         limit_count = int(limit) if limit is not None else None
         if limit_count is not None and limit_count < 0:
             limit_count = 0
         count = 0
         for _, item in candidates:
-            key_items = []
-            for k, v in item.items():
-                if k == "Front Month":
-                    continue
-                key_items.append((str(k), "" if v is None else str(v)))
-            key = tuple(sorted(key_items))
+            key = _dedup_key(item)
             if key in seen_keys:
                 continue
             seen_keys.add(key)
@@ -679,8 +790,10 @@ def normalize_front_month(value) -> bool:
         return value
     return str(value).strip().lower() == "true"
 
-def resolve_watchlist_filters(cfg: dict) -> dict[str, dict[str, int | None]]:
+def resolve_watchlist_filters(cfg: dict) -> Mapping[str, Mapping[str, int | None]]:
     cfg_filters = cfg.get("watchlist_filters") or {}
+    if not cfg_filters:
+        return _DEFAULT_WATCHLIST_FILTERS_FROZEN
     resolved: dict[str, dict[str, int | None]] = {}
     for bucket, prefixes in DEFAULT_WATCHLIST_FILTERS.items():
         cfg_value = cfg_filters.get(bucket)
@@ -726,57 +839,83 @@ def resolve_watchlist_filters(cfg: dict) -> dict[str, dict[str, int | None]]:
     return resolved
 
 def drop_false_front_month_duplicates(payload: list[dict]) -> list[dict]:
-    deduped: list[dict] = []
-    seen: dict[tuple[tuple[str, str], ...], int] = {}
+    # score: front month = 1, อื่นๆ = 0 -> แทนที่เฉพาะเมื่อ score สูงกว่า (ลำดับตาม key ที่เจอครั้งแรก)
+    best: dict[tuple[tuple[str, str], ...], tuple[int, dict]] = {}
     for item in payload:
-        key_items = []
-        for k, v in item.items():
-            if k == "Front Month":
-                continue
-            key_items.append((str(k), "" if v is None else str(v)))
-        key = tuple(sorted(key_items))
-        existing_idx = seen.get(key)
-        if existing_idx is None:
-            seen[key] = len(deduped)
-            deduped.append(item)
-            continue
-        if not normalize_front_month(deduped[existing_idx].get("Front Month")) and normalize_front_month(
-            item.get("Front Month")
-        ):
-            deduped[existing_idx] = item
-    return deduped
+        key = _dedup_key(item)
+        score = 1 if normalize_front_month(item.get("Front Month")) else 0
+        current = best.get(key)
+        if current is None or score > current[0]:
+            best[key] = (score, item)
+    return [item for _, item in best.values()]
 
 def save_filtered_watchlists(
     payload: list[dict],
     output_dir: Path,
     timestamp: str,
     timestamp_iso: str,
-    filters: dict[str, dict[str, int | None]],
+    filters: Mapping[str, Mapping[str, int | None]],
+    now: datetime | None = None,
 ) -> dict[str, int]:
     counts: dict[str, int] = {}
-    now = datetime.now()
-
+    if now is None:
+        now = datetime.now()
+
+    # หา code / ระยะ expiry ของแต่ละ item ครั้งเดียว ใช้ร่วมกันทุก bucket/prefix
+    codes = extract_codes_lower(payload)
+    distance_keys = build_distance_keys(payload, now)
+    all_prefixes = {prefix for prefixes in filters.values() for prefix in prefixes}
+    grouped = group_candidates_by_prefix(payload, all_prefixes, codes, distance_keys)
+    # item เดียวกันถูกเลือกได้หลาย bucket -> normalize expiry แค่ครั้งเดียวต่อ item
+    normalized_by_id: dict[int, dict] = {}
+    pending: list[tuple[str, list[dict], Path]] = []
     for bucket, prefixes in filters.items():
         bucket_dir = output_dir / bucket
         bucket_dir.mkdir(parents=True, exist_ok=True)
-        filtered_payload = filter_watchlist_by_prefix_limits(payload, prefixes, now)
+        filtered_payload = filter_watchlist_by_prefix_limits(
+            payload,
+            prefixes,
+            now,
+            grouped=grouped,
+        )
         filtered_payload = drop_false_front_month_duplicates(filtered_payload)
-        filtered_payload = [normalize_expiry_in_item(item) for item in filtered_payload]
+        normalized_payload = []
+        for item in filtered_payload:
+            normalized = normalized_by_id.get(id(item))
+            if normalized is None:
+                normalized = normalize_expiry_in_item(item)
+                normalized_by_id[id(item)] = normalized
+            normalized_payload.append(normalized)
+        filtered_payload = normalized_payload
         counts[bucket] = len(filtered_payload)
         output_path = append_timestamp_to_path(bucket_dir / "watchlist.json", timestamp)
-        try:
-            filtered_payload = add_timestamp_to_payload(filtered_payload, timestamp_iso)
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(filtered_payload, f, ensure_ascii=False, indent=2)
-            print(f"✅ saved {bucket} watchlist json: {output_path}")
-        except Exception as exc:
-            print(f"❌ write {bucket} watchlist json failed: {exc}")
+        pending.append((bucket, filtered_payload, output_path))
+
+    # เขียนไฟล์แต่ละ bucket พร้อมกัน (I/O ล้วน) เวลารวม ~ bucket ที่ช้าสุด
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            for bucket, filtered_payload, output_path in pending:
+                executor.submit(save_bucket_watchlist, bucket, filtered_payload, output_path, timestamp_iso)
     return counts
 
+def save_bucket_watchlist(
+    bucket: str,
+    filtered_payload: list[dict],
+    output_path: Path,
+    timestamp_iso: str,
+) -> None:
+    try:
+        filtered_payload = add_timestamp_to_payload(filtered_payload, timestamp_iso)
+        with open(output_path, "wb") as f:
+            f.write(dump_json_bytes(filtered_payload))
+        print(f"✅ saved {bucket} watchlist json: {output_path}")
+    except Exception as exc:
+        print(f"❌ write {bucket} watchlist json failed: {exc}")
+
 def main():
     cfg = load_config()
     logger = setup_logger()
-    messages: list[str] = []
+    messages = io.StringIO()
 
     auth_url = (cfg.get("auth_url") or DEFAULT_AUTH_URL).strip()
     user_data_dir = (cfg.get("user_data_dir") or os.environ.get("CME_USER_DATA_DIR") or "cme_profile").strip()
@@ -788,24 +927,19 @@ def main():
                 user_data_dir,
                 headless=False,
             )
+            context.add_init_script(script=_EXTRACT_WATCHLIST_INSTALLER)
             page = context.new_page()
+            page.set_default_timeout(DEFAULT_PAGE_TIMEOUT)
             try:
                 # 1) เริ่มที่ auth_url เสมอ
                 try:
-                    response = page.goto(auth_url, wait_until="domcontentloaded", timeout=NAV_TIMEOUT)
-                    page.wait_for_timeout(1200)
+                    response_text = goto_auth_url(page, auth_url)
                 except PlaywrightTimeoutError:
                     print("❌ goto auth_url timeout")
                     save_debug(page, "auth_timeout")
                     queue_telegram(messages, "❌ CME auth check: auth_url timeout", logger)
                     return 1
 
-                response_text = None
-                if response is not None:
-                    try:
-                        response_text = response.text()
-                    except Exception:
-                        response_text = None
                 state = detect_state(page, response_text=response_text)
                 print(f"STATE: {state} | url={page.url}")
                 queue_telegram(
@@ -846,32 +980,32 @@ def main():
                 user, pwd = pick_creds(cfg)
 
                 try:
-                    page.wait_for_selector("#user", timeout=20_000)
-                    page.wait_for_selector("#pwd", timeout=20_000)
-                    page.wait_for_selector("#loginBtn", timeout=20_000)
+                    # รอ #loginBtn (element สุดท้ายที่ใช้); fill/click รอ #user/#pwd เองตาม default timeout ของ page
+                    page.wait_for_selector("#loginBtn", state="attached")
 
                     page.fill("#user", user)
                     page.fill("#pwd", pwd)
-                    page.click("#loginBtn")
 
-                    # อาจติด reCAPTCHA/MFA -> ให้ทำเองได้
+                    # อาจติด reCAPTCHA/MFA -> ให้ทำเองได้ (ไม่รอ networkidle ยาวๆ แล้ว)
+                    clicked = False
                     try:
-                        page.wait_for_load_state("networkidle", timeout=30_000)
-                    except:
-                        pass
+                        with page.expect_response(
+                            lambda r: "login" in r.url and r.status < 400,
+                            timeout=LOGIN_RESPONSE_TIMEOUT,
+                        ):
+                            page.click("#loginBtn")
+                            clicked = True
+                    except PlaywrightTimeoutError:
+                        # click ไม่สำเร็จ -> ส่งต่อให้ except ข้างนอก; ปล่อยผ่านเฉพาะกรณีรอ response ไม่ทัน
+                        if not clicked:
+                            raise
+                        print("⚠️ login response not seen in time -> เช็คสถานะซ้ำต่อ")
 
                 except Exception as e:
                     print(f"❌ Error while filling login: {e}")
 
                 # 3) เช็คซ้ำด้วย auth_url
-                response = page.goto(auth_url, wait_until="domcontentloaded", timeout=NAV_TIMEOUT)
-                page.wait_for_timeout(1200)
-                response_text = None
-                if response is not None:
-                    try:
-                        response_text = response.text()
-                    except Exception:
-                        response_text = None
+                response_text = goto_auth_url(page, auth_url)
                 state2 = detect_state(page, response_text=response_text)
                 print(f"AFTER LOGIN STATE: {state2} | url={page.url}")
                 queue_telegram(
@@ -906,14 +1040,7 @@ def main():
                 print("➡️ ไปทำขั้นตอนบน browser ให้ผ่าน แล้วกลับมากด Enter เพื่อเช็คซ้ำ")
                 input()
 
-                response = page.goto(auth_url, wait_until="domcontentloaded", timeout=NAV_TIMEOUT)
-                page.wait_for_timeout(1200)
-                response_text = None
-                if response is not None:
-                    try:
-                        response_text = response.text()
-                    except Exception:
-                        response_text = None
+                response_text = goto_auth_url(page, auth_url)
                 state3 = detect_state(page, response_text=response_text)
                 print(f"AFTER MANUAL STATE: {state3} | url={page.url}")
                 queue_telegram(
@@ -953,8 +1080,8 @@ def main():
         return exit_code
 
     exit_code = run()
-    if messages:
-        notify_telegram(cfg, "\n\n".join(messages), logger)
+    if messages.tell():
+        notify_telegram(cfg, messages.getvalue(), logger)
     if exit_code:
         sys.exit(exit_code)
 
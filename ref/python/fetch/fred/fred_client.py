@@ -1,15 +1,31 @@
 from __future__ import annotations
 
 import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
 from typing import Optional
 
+FRED_OBSERVATIONS_URL = "https://api.stlouisfed.org/fred/series/observations"
+
+
+def create_fred_session(pool_maxsize: int = 10) -> requests.Session:
+    """
+    Shared keep-alive session: TCP/TLS handshake to api.stlouisfed.org once per run
+    """
+    session = requests.Session()
+    session.headers.update({"Accept": "application/json"})
+    # host เดียว; pool ต้องใหญ่เท่าจำนวน worker ไม่งั้น connection ส่วนเกินถูกทิ้งแทนที่จะ keep-alive
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize))
+    return session
+
 
 def fetch_fred_series_observations(
     series_id: str,
     api_key: Optional[str],
     observation_start: str,
     timeout_seconds: int = 30,
+    session: Optional[requests.Session] = None,
 ) -> pd.DataFrame:
     """
     Returns DataFrame columns: date, value
@@ -23,8 +39,8 @@ def fetch_fred_series_observations(
     if key:
         params["api_key"] = key
 
-    url = "https://api.stlouisfed.org/fred/series/observations"
-    r = requests.get(url, params=params, timeout=timeout_seconds)
+    http = session if session is not None else requests
+    r = http.get(FRED_OBSERVATIONS_URL, params=params, timeout=timeout_seconds)
     r.raise_for_status()
     data = r.json()
 
@@ -32,14 +48,31 @@ def fetch_fred_series_observations(
     if not obs:
         raise RuntimeError(f"No observations returned for series_id={series_id}")
 
-    df = pd.DataFrame(obs)
-    # df has: date, value (value can be ".")
-    df = df[["date", "value"]].copy()
-    df["date"] = pd.to_datetime(df["date"])
-    df["value"] = pd.to_numeric(df["value"].replace(".", pd.NA), errors="coerce")
+    # fill column arrays at final size; FRED uses "." for missing values
+    size = len(obs)
+    dates = np.empty(size, dtype="datetime64[D]")
+    values = np.empty(size, dtype=np.float64)
+    for i, item in enumerate(obs):
+        dates[i] = item["date"]
+        values[i] = _parse_value(item.get("value"))
+
+    keep = ~np.isnan(values)
+    dates = dates[keep]
+    values = values[keep]
+    order = np.argsort(dates, kind="stable")
+
+    return pd.DataFrame(
+        {
+            "date": dates[order].astype("datetime64[ns]"),
+            "value": values[order],
+        }
+    )
 
-    # drop rows where value missing (FRED returns "." sometimes)
-    df = df.dropna(subset=["value"]).reset_index(drop=True)
-    df = df.sort_values("date").reset_index(drop=True)
 
-    return df
+def _parse_value(raw) -> float:
+    if raw is None or raw == ".":
+        return np.nan
+    try:
+        return float(raw)
+    except (TypeError, ValueError):
+        return np.nan
@@ -2,20 +2,29 @@ from __future__ import annotations
 
 import json
 import os
+import random
 import time
 import logging
 from pathlib import Path
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from zoneinfo import ZoneInfo
 from typing import Any, Dict
 
-import yaml
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback to stdlib json
+    orjson = None
 
 
 def load_config(path: str) -> Dict[str, Any]:
+    import yaml  # import ตอนใช้จริง (ไม่ถ่วง startup ของ script ที่ไม่ได้อ่าน config)
+
     load_env_file(Path(path).resolve().parent)
-    with open(path, "r", encoding="utf-8") as f:
-        cfg = yaml.safe_load(f)
+    # libyaml (C) loader ถ้า PyYAML build มาพร้อม libyaml; ไม่งั้นใช้ SafeLoader ปกติ
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(path, "rb") as f:
+        cfg = yaml.load(f, Loader=loader)
     return apply_env_overrides(cfg)
 
 
@@ -69,6 +78,7 @@ def utc_now_iso() -> str:
 
 
 TH_TZ = ZoneInfo("Asia/Bangkok")
+_LOGGERS: Dict[str, tuple[Path, logging.Logger]] = {}
 
 
 def thai_now_iso() -> str:
@@ -91,24 +101,44 @@ def datetime_th_compact() -> str:
     return datetime.now(TH_TZ).strftime("%Y%m%d_%H%M%S")
 
 
-def atomic_write_text(path: Path, text: str) -> None:
+def atomic_write_bytes(path: Path, data: bytes, fsync: bool = False) -> None:
+    # raw fd write: no buffered-IO layer; fsync (ถ้าขอ) ก่อน replace กัน swap แล้วเจอไฟล์ครึ่งๆ หลังเครื่องดับ
     tmp = path.with_suffix(path.suffix + ".tmp")
-    tmp.write_text(text, encoding="utf-8")
-    tmp.replace(path)
-
-
-def atomic_write_json(path: Path, payload: Dict[str, Any]) -> None:
-    text = json.dumps(payload, ensure_ascii=False, indent=2)
-    atomic_write_text(path, text)
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        written = 0
+        while written < len(view):
+            written += os.write(fd, view[written:])
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+
+
+def atomic_write_json(path: Path, payload: Dict[str, Any], fsync: bool = False) -> None:
+    if orjson is not None:
+        data = orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        data = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+    atomic_write_bytes(path, data, fsync=fsync)
 
 
 def setup_logger(logs_dir: Path, name: str = "fetch") -> logging.Logger:
+    log_file = Path(logs_dir).resolve() / f"{name}_{datetime.now().strftime('%Y%m%d')}.log"
+    cached = _LOGGERS.get(name)
+    if cached is not None and cached[0] == log_file:
+        return cached[1]
+
     ensure_dir(logs_dir)
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
+    for handler in logger.handlers:
+        handler.close()
     logger.handlers.clear()
+    logger.propagate = False
 
-    log_file = logs_dir / f"{name}_{datetime.now().strftime('%Y%m%d')}.log"
     fh = logging.FileHandler(log_file, encoding="utf-8")
     fh.setLevel(logging.INFO)
 
@@ -121,17 +151,56 @@ def setup_logger(logs_dir: Path, name: str = "fetch") -> logging.Logger:
 
     logger.addHandler(fh)
     logger.addHandler(sh)
+    _LOGGERS[name] = (log_file, logger)
     return logger
 
 
-def retry(fn, attempts: int, sleep_seconds: int, logger: logging.Logger, label: str):
-    last_err = None
+# requests.RequestException สืบทอดจาก OSError อยู่แล้ว -> ครอบ network error ทั้งหมดโดยไม่ต้อง import requests
+RETRYABLE_ERRORS: tuple[type[BaseException], ...] = (TimeoutError, OSError)
+
+
+def _retry_after_seconds(err: BaseException) -> float | None:
+    # HTTP 429 + Retry-After (วินาที หรือ HTTP-date)
+    response = getattr(err, "response", None)
+    if response is None or getattr(response, "status_code", None) != 429:
+        return None
+    value = (getattr(response, "headers", None) or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+
+
+def retry(
+    fn,
+    attempts: int,
+    sleep_seconds: float,
+    logger: logging.Logger,
+    label: str,
+    retry_on: tuple[type[BaseException], ...] = RETRYABLE_ERRORS,
+):
     for i in range(1, attempts + 1):
         try:
             return fn()
-        except Exception as e:
-            last_err = e
+        except retry_on as e:
             logger.warning(f"{label}: attempt {i}/{attempts} failed: {e}")
-            if i < attempts:
-                time.sleep(sleep_seconds)
-    raise last_err
+            if i >= attempts:
+                raise
+            delay = _retry_after_seconds(e)
+            if delay is not None:
+                # Retry-After มาจาก server: จำกัดเพดานกัน worker ค้างเป็นชั่วโมง; เกินเพดานให้ series นี้ fail ไปเลย
+                max_delay = max(sleep_seconds * (2 ** (attempts - 1)), 60)
+                if delay > max_delay:
+                    logger.warning(f"{label}: Retry-After {delay:.0f}s exceeds cap {max_delay:.0f}s; giving up.")
+                    raise
+            else:
+                # exponential backoff + jitter กัน request ชนกันเป็นจังหวะเดียว
+                delay = sleep_seconds * (2 ** (i - 1)) + random.uniform(0, sleep_seconds * 0.5)
+            time.sleep(delay)
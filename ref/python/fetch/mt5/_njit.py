@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+# numba เป็น optional: ถ้าไม่มีให้ njit เป็น decorator เปล่า (คืนฟังก์ชันเดิม)
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - numba is optional
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
@@ -3,8 +3,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Iterable, Sequence
 
+import numpy as np
 import pandas as pd
 
+from _njit import NUMBA_AVAILABLE, njit
+
 
 @dataclass
 class FeatureSpec:
@@ -48,77 +51,144 @@ OPTIONAL_FEATURES = [
 ]
 
 
+# 0/1 flag columns (swing/sweep/bos/choch): uint8 ลด memory bandwidth ตอน scan ใน summary
+FLAG_DTYPE = np.uint8
+
+
 def _safe_close_pos(df: pd.DataFrame) -> pd.Series:
     rng = df["high"] - df["low"]
     pos = (df["close"] - df["low"]) / rng.replace(0, pd.NA)
     return pos.fillna(0.0)
 
 
+@njit(cache=True)
+def _atr14_ema(tr: np.ndarray) -> np.ndarray:
+    # recurrence เดียวกับ pandas ewm(alpha=1/14, adjust=False, min_periods=1).mean() (รวม NaN handling)
+    # alpha คำนวณผ่าน com แบบ pandas ให้ได้ค่า float ตรงกันทุก bit
+    com = (1.0 - 1.0 / 14.0) / (1.0 / 14.0)
+    alpha = 1.0 / (1.0 + com)
+    old_wt_factor = 1.0 - alpha
+    size = tr.shape[0]
+    out = np.empty(size, dtype=np.float64)
+    if size == 0:
+        return out
+    weighted = tr[0]
+    nobs = 0 if np.isnan(weighted) else 1
+    out[0] = weighted if nobs >= 1 else np.nan
+    old_wt = 1.0
+    for i in range(1, size):
+        cur = tr[i]
+        is_obs = not np.isnan(cur)
+        if is_obs:
+            nobs += 1
+        if not np.isnan(weighted):
+            old_wt *= old_wt_factor
+            if is_obs:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif is_obs:
+            weighted = cur
+        out[i] = weighted if nobs >= 1 else np.nan
+    return out
+
+
+@njit(cache=True)
+def _swings(highs: np.ndarray, lows: np.ndarray, left: int, right: int) -> tuple[np.ndarray, np.ndarray]:
+    size = highs.shape[0]
+    swing_high = np.zeros(size, dtype=np.uint8)
+    swing_low = np.zeros(size, dtype=np.uint8)
+    for i in range(left, size - right):
+        is_high = True
+        is_low = True
+        for j in range(i - left, i + right + 1):
+            if j == i:
+                continue
+            # NaN เทียบแล้วเป็น False เสมอ -> ไม่ใช่ pivot (เหมือน rolling ที่มี NaN ใน window)
+            if not highs[i] > highs[j]:
+                is_high = False
+            if not lows[i] < lows[j]:
+                is_low = False
+        swing_high[i] = is_high
+        swing_low[i] = is_low
+    return swing_high, swing_low
+
+
 def _swing_flags(df: pd.DataFrame, left: int, right: int) -> tuple[pd.Series, pd.Series]:
-    highs = df["high"].to_numpy()
-    lows = df["low"].to_numpy()
-    size = len(df)
-    swing_high = [0] * size
-    swing_low = [0] * size
-    for idx in range(size):
-        if idx < left or idx + right >= size:
-            continue
-        high_window = highs[idx - left: idx + right + 1]
-        low_window = lows[idx - left: idx + right + 1]
-        current_high = highs[idx]
-        current_low = lows[idx]
-        if current_high == high_window.max() and current_high > high_window[:left].max() and current_high > high_window[left + 1:].max():
-            swing_high[idx] = 1
-        if current_low == low_window.min() and current_low < low_window[:left].min() and current_low < low_window[left + 1:].min():
-            swing_low[idx] = 1
-    return pd.Series(swing_high, index=df.index), pd.Series(swing_low, index=df.index)
+    # pivot = สูง/ต่ำกว่าทุก bar ทั้ง left ตัวก่อนหน้าและ right ตัวถัดไป (strict)
+    if NUMBA_AVAILABLE:
+        swing_high, swing_low = _swings(
+            df["high"].to_numpy(dtype=np.float64),
+            df["low"].to_numpy(dtype=np.float64),
+            left,
+            right,
+        )
+        return pd.Series(swing_high, index=df.index), pd.Series(swing_low, index=df.index)
+    highs = df["high"]
+    lows = df["low"]
+    left_high = highs.rolling(left).max().shift(1)
+    right_high = highs.rolling(right).max().shift(-right)
+    left_low = lows.rolling(left).min().shift(1)
+    right_low = lows.rolling(right).min().shift(-right)
+    swing_high = ((highs > left_high) & (highs > right_high)).astype(FLAG_DTYPE)
+    swing_low = ((lows < left_low) & (lows < right_low)).astype(FLAG_DTYPE)
+    return swing_high, swing_low
+
+
+def _atr14(tr: pd.Series) -> pd.Series:
+    # ไม่มี numba: loop Python ช้ากว่า ewm ของ pandas (C) จึงใช้ ewm ตรงๆ
+    if NUMBA_AVAILABLE:
+        return pd.Series(_atr14_ema(tr.to_numpy(dtype=np.float64)), index=tr.index)
+    return tr.ewm(alpha=1 / 14, adjust=False, min_periods=1).mean()
+
+
+STRUCTURE_EVENT_NAMES = np.array([None, "BOS_UP", "BOS_DN", "CHOCH_UP", "CHOCH_DN"], dtype=object)
+
+
+def _structure_scan(highs, lows, closes, swing_high, swing_low) -> np.ndarray:
+    # event code ต่อ bar: 0=None, 1=BOS_UP, 2=BOS_DN, 3=CHOCH_UP, 4=CHOCH_DN
+    size = len(closes)
+    codes = np.zeros(size, dtype=np.int8)
+    has_swing_high = False
+    has_swing_low = False
+    last_swing_high = 0.0
+    last_swing_low = 0.0
+    trend = 0  # 1 = up, -1 = down, 0 = ยังไม่มี
+
+    for i in range(size):
+        if swing_high[i] == 1:
+            last_swing_high = highs[i]
+            has_swing_high = True
+        if swing_low[i] == 1:
+            last_swing_low = lows[i]
+            has_swing_low = True
+
+        close = closes[i]
+        if has_swing_high and close > last_swing_high:
+            codes[i] = 3 if trend == -1 else 1
+            trend = 1
+        elif has_swing_low and close < last_swing_low:
+            codes[i] = 4 if trend == 1 else 2
+            trend = -1
+
+    return codes
 
 
 def _structure_events(df: pd.DataFrame) -> pd.DataFrame:
-    events: list[str | None] = [None] * len(df)
-    bos_up = [0] * len(df)
-    bos_dn = [0] * len(df)
-    choch_up = [0] * len(df)
-    choch_dn = [0] * len(df)
-
-    last_swing_high = None
-    last_swing_low = None
-    trend = None
-
-    for i, row in df.iterrows():
-        if row["swing_high"] == 1:
-            last_swing_high = row["high"]
-        if row["swing_low"] == 1:
-            last_swing_low = row["low"]
-
-        close = row["close"]
-        event = None
-        if last_swing_high is not None and close > last_swing_high:
-            if trend == "down":
-                event = "CHOCH_UP"
-                choch_up[i] = 1
-            else:
-                event = "BOS_UP"
-                bos_up[i] = 1
-            trend = "up"
-        elif last_swing_low is not None and close < last_swing_low:
-            if trend == "up":
-                event = "CHOCH_DN"
-                choch_dn[i] = 1
-            else:
-                event = "BOS_DN"
-                bos_dn[i] = 1
-            trend = "down"
-
-        events[i] = event
-
+    codes = _structure_scan(
+        df["high"].tolist(),
+        df["low"].tolist(),
+        df["close"].tolist(),
+        df["swing_high"].tolist(),
+        df["swing_low"].tolist(),
+    )
     return pd.DataFrame(
         {
-            "structure_event": events,
-            "bos_up": bos_up,
-            "bos_dn": bos_dn,
-            "choch_up": choch_up,
-            "choch_dn": choch_dn,
+            "structure_event": np.take(STRUCTURE_EVENT_NAMES, codes),
+            "bos_up": (codes == 1).astype(FLAG_DTYPE),
+            "bos_dn": (codes == 2).astype(FLAG_DTYPE),
+            "choch_up": (codes == 3).astype(FLAG_DTYPE),
+            "choch_dn": (codes == 4).astype(FLAG_DTYPE),
         },
         index=df.index,
     )
@@ -133,7 +203,9 @@ def _prev_period_levels(df: pd.DataFrame, period: str) -> pd.DataFrame:
     period_key = df["time_th"].dt.to_period(freq_map[period])
     grouped = df.groupby(period_key).agg(high=("high", "max"), low=("low", "min"), close=("close", "last"))
     shifted = grouped.shift(1)
-    prev = shifted.reindex(period_key).reset_index(drop=True)
+    prev = shifted.reindex(period_key)
+    # reindex คืน index เป็น period key; ตั้ง RangeIndex ตรงๆ แทน reset_index (ไม่สร้าง frame ใหม่)
+    prev.index = pd.RangeIndex(len(prev))
 
     prefix_map = {"D": "pd", "W": "pw", "M": "pm"}
     prefix = prefix_map[period]
@@ -153,44 +225,54 @@ def compute_features(
     pivot_right: int,
     prev_period: str | None = None,
 ) -> pd.DataFrame:
-    out = df.copy()
-    prev_close = out["close"].shift(1)
-    range_ = out["high"] - out["low"]
-    tr = pd.concat(
-        [
-            range_,
-            (out["high"] - prev_close).abs(),
-            (out["low"] - prev_close).abs(),
-        ],
-        axis=1,
-    ).max(axis=1)
-
-    out["tr"] = tr
-    out["atr14"] = tr.ewm(alpha=1 / 14, adjust=False, min_periods=1).mean()
-    out["range"] = range_
-    out["body"] = (out["close"] - out["open"]).abs()
-    out["upper_wick"] = out["high"] - out[["open", "close"]].max(axis=1)
-    out["lower_wick"] = out[["open", "close"]].min(axis=1) - out["low"]
-    out["close_pos"] = _safe_close_pos(out)
+    high = df["high"].to_numpy()
+    low = df["low"].to_numpy()
+    open_ = df["open"].to_numpy()
+    close = df["close"].to_numpy()
+    prev_close = df["close"].shift(1).to_numpy()
+    range_ = high - low
+    # fmax/fmin ข้าม NaN เหมือน DataFrame.max(axis=1) (แถวแรก prev_close เป็น NaN -> tr = range)
+    tr = pd.Series(
+        np.fmax(np.fmax(range_, np.abs(high - prev_close)), np.abs(low - prev_close)),
+        index=df.index,
+    )
+    body_top = np.fmax(open_, close)
+    body_bottom = np.fmin(open_, close)
+
+    bar_columns = {
+        "tr": tr,
+        "atr14": _atr14(tr),
+        "range": range_,
+        "body": np.abs(close - open_),
+        "upper_wick": high - body_top,
+        "lower_wick": body_bottom - low,
+        "close_pos": _safe_close_pos(df),
+    }
+    # assign คืน frame ใหม่ (ไม่แก้ df ของ caller และไม่ deep copy ทั้ง frame ก่อน)
+    out = df.assign(**bar_columns)
 
     swing_high, swing_low = _swing_flags(out, pivot_left, pivot_right)
     out["swing_high"] = swing_high
     out["swing_low"] = swing_low
 
     structure = _structure_events(out)
-    out = pd.concat([out, structure], axis=1)
+    for name in structure.columns:
+        out[name] = structure[name]
 
     out["ema20"] = out["close"].ewm(span=20, adjust=False).mean()
     out["ema50"] = out["close"].ewm(span=50, adjust=False).mean()
 
     if prev_period:
         prev_levels = _prev_period_levels(out, prev_period)
-        out = pd.concat([out.reset_index(drop=True), prev_levels], axis=1)
-        out["sweep_prev_high"] = ((out["high"] > prev_levels.iloc[:, 0]) & (out["close"] < prev_levels.iloc[:, 0])).astype(int)
-        out["sweep_prev_low"] = ((out["low"] < prev_levels.iloc[:, 1]) & (out["close"] > prev_levels.iloc[:, 1])).astype(int)
+        for name in prev_levels.columns:
+            out[name] = prev_levels[name].to_numpy()
+        prev_high = prev_levels.iloc[:, 0].to_numpy()
+        prev_low = prev_levels.iloc[:, 1].to_numpy()
+        out["sweep_prev_high"] = ((out["high"].to_numpy() > prev_high) & (out["close"].to_numpy() < prev_high)).astype(FLAG_DTYPE)
+        out["sweep_prev_low"] = ((out["low"].to_numpy() < prev_low) & (out["close"].to_numpy() > prev_low)).astype(FLAG_DTYPE)
     else:
-        out["sweep_prev_high"] = 0
-        out["sweep_prev_low"] = 0
+        out["sweep_prev_high"] = np.zeros(len(out), dtype=FLAG_DTYPE)
+        out["sweep_prev_low"] = np.zeros(len(out), dtype=FLAG_DTYPE)
 
     return out
 
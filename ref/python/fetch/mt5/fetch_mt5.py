@@ -10,6 +10,8 @@ from zoneinfo import ZoneInfo
 import MetaTrader5 as mt5
 
 
+TH_TZ = ZoneInfo("Asia/Bangkok")
+
 TF_MAP = {
     "D1": mt5.TIMEFRAME_D1,
     "H4": mt5.TIMEFRAME_H4,
@@ -54,7 +56,14 @@ class MT5Client:
             if not mt5.symbol_select(symbol, True):
                 raise RuntimeError(f"symbol_select({symbol}, True) failed")
 
-    def fetch_rates(self, symbol: str, timeframe: str, bars: int, store_time_as_th: bool = True) -> MT5FetchResult:
+    def fetch_rates(
+        self,
+        symbol: str,
+        timeframe: str,
+        bars: int,
+        store_time_as_th: bool = True,
+        price_dtype: str = "float64",
+    ) -> MT5FetchResult:
         if timeframe not in TF_MAP:
             raise ValueError(f"Unsupported timeframe: {timeframe}. Use one of {list(TF_MAP.keys())}")
 
@@ -65,23 +74,20 @@ class MT5Client:
         if rates is None or len(rates) == 0:
             raise RuntimeError(f"copy_rates_from_pos returned empty for {symbol} {timeframe}")
 
-        df = pd.DataFrame(rates)
         # MT5 returns 'time' as POSIX seconds; treat as UTC then convert to Thailand time.
-        th_tz = ZoneInfo("Asia/Bangkok")
-        df["time"] = pd.to_datetime(df["time"], unit="s", utc=True).dt.tz_convert(th_tz)
-
-        # Normalize columns
-        df = df.rename(columns={
-            "time": "time_th",
-            "tick_volume": "tick_volume",
-        })
-
-        # Keep only common columns
-        keep = ["time_th", "open", "high", "low", "close", "tick_volume"]
-        for col in keep:
-            if col not in df.columns:
-                df[col] = None
-        df = df[keep].copy()
+        # Build the frame straight from the recarray columns (no rename/keep/copy pass).
+        time_th = pd.to_datetime(rates["time"], unit="s", utc=True).tz_convert(TH_TZ)
+        df = pd.DataFrame(
+            {
+                "time_th": time_th,
+                "open": rates["open"].astype(price_dtype, copy=False),
+                "high": rates["high"].astype(price_dtype, copy=False),
+                "low": rates["low"].astype(price_dtype, copy=False),
+                "close": rates["close"].astype(price_dtype, copy=False),
+                # tick_volume เป็น integer คง dtype เดิม
+                "tick_volume": rates["tick_volume"],
+            }
+        )
 
         # Sort and drop duplicates
         df = df.sort_values("time_th").drop_duplicates(subset=["time_th"], keep="last").reset_index(drop=True)
@@ -1,10 +1,15 @@
 # pipeline.py
 from __future__ import annotations
 
+import importlib.util
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Any, List, Callable
 
+import numpy as np
 import pandas as pd
 
 from fetch_mt5 import MT5Client
@@ -19,6 +24,8 @@ from utils import (
     build_feature_filename,
     save_json,
     load_cache_json,
+    save_parquet,
+    load_parquet,
     find_latest_cache,
 )
 from features import compute_features, select_feature_columns
@@ -26,6 +33,7 @@ from zoneinfo import ZoneInfo
 
 
 TH_TZ = ZoneInfo("Asia/Bangkok")
+_UTC = ZoneInfo("UTC")
 
 TIMEFRAME_RANK = {
     "MN1": 600,
@@ -43,6 +51,12 @@ TIMEFRAME_RANK = {
     "M1": 170,
 }
 
+# MT5 timeframe: ตัวอักษรนำหน้าตามด้วยตัวเลข เช่น H4, D1, MN1
+_TF_RE = re.compile(r"^([A-Z]+)(\d+)$")
+
+PRICE_DTYPES = ("float64", "float32")
+PREV_LEVEL_KEYS = ("pdh", "pdl", "pdc", "pwh", "pwl", "pwc", "pmh", "pml", "pmc")
+
 
 def _safe_float(value: Any, decimals: int | None = None) -> float | None:
     if value is None or pd.isna(value):
@@ -53,6 +67,16 @@ def _safe_float(value: Any, decimals: int | None = None) -> float | None:
     return out
 
 
+def _floats_or_none(values: np.ndarray) -> List[float | None]:
+    # bulk แทน _safe_float ทีละค่า: NaN -> None
+    return [None if value != value else value for value in np.asarray(values, dtype=np.float64).tolist()]
+
+
+def _last_values(df: pd.DataFrame, columns: List[str]) -> List[float | None]:
+    # ค่าแถวสุดท้ายทีละ column ด้วย iat (ไม่สร้าง row Series แบบ object จาก iloc[-1])
+    return _floats_or_none(np.array([df[col].iat[-1] for col in columns], dtype=np.float64))
+
+
 def _safe_int(value: Any) -> int | None:
     if value is None or pd.isna(value):
         return None
@@ -60,6 +84,9 @@ def _safe_int(value: Any) -> int | None:
 
 
 def _ensure_th(ts: pd.Timestamp) -> pd.Timestamp:
+    # fast path: time_th จาก fetch_rates ผูก ZoneInfo("Asia/Bangkok") ตัวเดียวกันอยู่แล้ว (ZoneInfo cache instance)
+    if ts.tzinfo is TH_TZ:
+        return ts
     if ts.tzinfo is None:
         return ts.tz_localize(TH_TZ)
     return ts.tz_convert(TH_TZ)
@@ -69,8 +96,29 @@ def _time_iso_th(ts: pd.Timestamp) -> str:
     return _ensure_th(ts).isoformat(timespec="seconds")
 
 
+def _iso_th_array(times: pd.Series) -> np.ndarray:
+    # _time_iso_th ทั้ง column ครั้งเดียว: datetime_as_string (C loop) + offset suffix แบบ "+07:00"
+    if times.dt.tz is None:
+        local = times.dt.tz_localize(TH_TZ)
+    else:
+        local = times.dt.tz_convert(TH_TZ)
+    wall = local.dt.tz_localize(None).to_numpy(dtype="datetime64[s]")
+    utc = local.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy(dtype="datetime64[s]")
+    offset_minutes = (wall - utc).astype(np.int64) // 60
+    suffixes = {
+        minutes: f"{'+' if minutes >= 0 else '-'}{abs(minutes) // 60:02d}:{abs(minutes) % 60:02d}"
+        for minutes in np.unique(offset_minutes).tolist()
+    }
+    stamps = np.datetime_as_string(wall, unit="s")
+    if len(suffixes) == 1:
+        suffix = next(iter(suffixes.values()))
+    else:
+        suffix = np.array([suffixes[minutes] for minutes in offset_minutes.tolist()])
+    return np.char.add(stamps, suffix).astype(object)
+
+
 def _time_iso_utc(ts: pd.Timestamp) -> str:
-    return _ensure_th(ts).tz_convert("UTC").isoformat(timespec="seconds").replace("+00:00", "Z")
+    return _ensure_th(ts).tz_convert(_UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
 def _trend_hint_from_event(event_type: str | None) -> str | None:
@@ -85,23 +133,43 @@ def _trend_hint_from_event(event_type: str | None) -> str | None:
 
 
 def _format_last_event(
-    features_df: pd.DataFrame,
     event_type: str,
-    idx: int,
+    pos: int,
     asof_index: int,
+    iso_times: np.ndarray,
+    closes: np.ndarray,
 ) -> Dict[str, Any]:
-    idx_pos = int(features_df.index.get_loc(idx))
-    age_bars = max(0, asof_index - idx_pos)
+    # pos = ตำแหน่งแถว (positional) ใน features_df
     return {
-        "type": event_type,
-        "time_th": _time_iso_th(pd.Timestamp(features_df.loc[idx, "time_th"])),
-        "level_close": _safe_float(features_df.loc[idx, "close"]),
-        "age_bars": age_bars,
+        "type": str(event_type),
+        "time_th": iso_times[pos],
+        "level_close": _safe_float(closes[pos]),
+        "age_bars": max(0, asof_index - pos),
     }
 
-def _age_days(asof_time: pd.Timestamp, event_time: pd.Timestamp) -> int:
-    delta_days = (asof_time - event_time).total_seconds() / 86400
-    return max(0, int(delta_days))
+
+def _swing_positions(
+    features_df: pd.DataFrame,
+    flag_col: str,
+    price_col: str,
+    price_filter: Callable[[np.ndarray], np.ndarray] | None = None,
+    mask: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    # คืน (positions, prices) ของ swing ที่ผ่าน filter; price_filter รับ/คืน array (vector mask)
+    prices = features_df[price_col].to_numpy(dtype=np.float64)
+    keep = (features_df[flag_col].to_numpy() == 1) & ~np.isnan(prices)
+    if mask is not None:
+        keep &= mask
+    if price_filter is not None:
+        keep &= price_filter(prices)
+    positions = np.flatnonzero(keep)
+    return positions, prices[positions]
+
+
+def _age_days_array(asof_time: pd.Timestamp, time_ns: np.ndarray) -> np.ndarray:
+    # อายุ (วันเต็ม, ไม่ติดลบ) ของทุก bar เทียบ asof_time; time_ns เป็น epoch ns (DatetimeIndex.asi8)
+    delta_ns = asof_time.as_unit("ns").value - time_ns
+    return np.maximum(0, delta_ns // 86_400_000_000_000)
 
 
 def _collect_swings_recent(
@@ -110,27 +178,16 @@ def _collect_swings_recent(
     price_col: str,
     asof_time: pd.Timestamp,
     window_days: int,
-    price_filter: Callable[[float], bool] | None = None,
+    iso_times: np.ndarray,
+    price_filter: Callable[[np.ndarray], np.ndarray] | None = None,
 ) -> List[Dict[str, Any]]:
     start_time = asof_time - pd.Timedelta(days=window_days)
-    swings = features_df.loc[
-        (features_df[flag_col] == 1) & (features_df["time_th"] >= start_time),
-        ["time_th", price_col],
+    in_window = (features_df["time_th"] >= start_time).to_numpy()
+    positions, prices = _swing_positions(features_df, flag_col, price_col, price_filter, in_window)
+    return [
+        {"time_th": time_th, "price": price}
+        for time_th, price in zip(iso_times[positions], prices.tolist())
     ]
-    payload = []
-    for _, row in swings.iterrows():
-        price = _safe_float(row[price_col])
-        if price is None:
-            continue
-        if price_filter and not price_filter(price):
-            continue
-        payload.append(
-            {
-                "time_th": _time_iso_th(pd.Timestamp(row["time_th"])),
-                "price": price,
-            }
-        )
-    return payload
 
 
 def _collect_swings_nearest(
@@ -141,48 +198,41 @@ def _collect_swings_nearest(
     price_now: float,
     atr: float,
     max_distance_atr: float,
-    price_filter: Callable[[float], bool] | None = None,
+    iso_times: np.ndarray,
+    price_filter: Callable[[np.ndarray], np.ndarray] | None = None,
 ) -> List[Dict[str, Any]]:
-    swings = features_df.loc[features_df[flag_col] == 1, ["time_th", price_col]]
-    payload = []
-    for _, row in swings.iterrows():
-        price = _safe_float(row[price_col])
-        if price is None:
-            continue
-        if price_filter and not price_filter(price):
-            continue
-        distance_atr = abs(price - price_now) / atr
-        if distance_atr > max_distance_atr:
-            continue
-        time_th = pd.Timestamp(row["time_th"])
-        payload.append(
-            {
-                "time_th": _time_iso_th(time_th),
-                "price": price,
-                "distance_atr": distance_atr,
-            }
+    positions, prices = _swing_positions(features_df, flag_col, price_col, price_filter)
+    distance_atr = np.abs(prices - price_now) / atr
+    near = distance_atr <= max_distance_atr
+    positions, prices, distance_atr = positions[near], prices[near], distance_atr[near]
+    # stable sort = ลำดับเดิมของ list.sort(key=distance_atr)
+    order = np.argsort(distance_atr, kind="stable")
+    return [
+        {"time_th": time_th, "price": price, "distance_atr": distance}
+        for time_th, price, distance in zip(
+            iso_times[positions[order]], prices[order].tolist(), distance_atr[order].tolist()
         )
-    payload.sort(key=lambda item: item["distance_atr"])
-    return payload
+    ]
 
 
-def _build_positioning_atr(last_row: pd.Series, prev_levels: Dict[str, Any]) -> Dict[str, Any] | None:
-    atr = _safe_float(last_row.get("atr14"))
-    price_now = _safe_float(last_row.get("close"))
+def _build_positioning_atr(
+    price_now: float | None,
+    atr: float | None,
+    prev_levels: Dict[str, float],
+    emas: Dict[str, float | None],
+) -> Dict[str, Any] | None:
     if atr is None or atr == 0 or price_now is None:
         return None
+    keys = [f"dist_to_{str(level_key).upper()}_atr" for level_key in prev_levels]
+    values = list(prev_levels.values())
+    for ema_key, ema_value in emas.items():
+        if ema_value is not None:
+            keys.append(f"dist_to_{ema_key}_atr")
+            values.append(ema_value)
+    distances = np.abs(np.asarray(values, dtype=np.float64) - price_now) / atr
+    # round() ของ Python (ไม่ใช่ np.round) ให้ผลปัดเศษเหมือนเดิมทุกค่า
     payload: Dict[str, Any] = {"price_now": price_now}
-    for level_key, level_value in prev_levels.items():
-        if level_value is None:
-            continue
-        level_label = str(level_key).upper()
-        payload[f"dist_to_{level_label}_atr"] = _safe_float(abs(float(level_value) - price_now) / atr, 4)
-    ema20 = _safe_float(last_row.get("ema20"))
-    if ema20 is not None:
-        payload["dist_to_ema20_atr"] = _safe_float(abs(ema20 - price_now) / atr, 4)
-    ema50 = _safe_float(last_row.get("ema50"))
-    if ema50 is not None:
-        payload["dist_to_ema50_atr"] = _safe_float(abs(ema50 - price_now) / atr, 4)
+    payload.update(zip(keys, (round(distance, 4) for distance in distances.tolist())))
     return payload
 
 
@@ -193,43 +243,43 @@ def _summary_timeframe_payload(
     bars: int,
     prev_period: str | None,
 ) -> Dict[str, Any]:
-    last_raw = raw_df.iloc[-1]
-    last_features = features_df.iloc[-1]
-    asof_time = pd.Timestamp(last_raw["time_th"])
+    # ดึง column ที่ใช้ซ้ำเป็น numpy ครั้งเดียว แล้วอ่านตามตำแหน่ง (ไม่ใช้ .loc/.iloc row lookup)
+    asof_time = pd.Timestamp(raw_df["time_th"].iat[-1])
     asof_index = len(features_df) - 1
+    iso_times = _iso_th_array(features_df["time_th"])
+    closes = features_df["close"].to_numpy()
+    age_days_all = _age_days_array(asof_time, pd.DatetimeIndex(features_df["time_th"]).as_unit("ns").asi8)
 
+    ohlc_cols = ["open", "high", "low", "close"]
     last_bar = {
-        "time_th": _time_iso_th(pd.Timestamp(last_raw["time_th"])),
-        "open": _safe_float(last_raw.get("open")),
-        "high": _safe_float(last_raw.get("high")),
-        "low": _safe_float(last_raw.get("low")),
-        "close": _safe_float(last_raw.get("close")),
-        "tick_volume": _safe_int(last_raw.get("tick_volume")),
+        "time_th": _time_iso_th(asof_time),
+        **dict(zip(ohlc_cols, _last_values(raw_df, ohlc_cols))),
+        "tick_volume": _safe_int(raw_df["tick_volume"].iat[-1]) if "tick_volume" in raw_df.columns else None,
     }
 
-    indicators = {
-        "atr14": _safe_float(last_features.get("atr14")),
-        "ema20": _safe_float(last_features.get("ema20")),
-        "ema50": _safe_float(last_features.get("ema50")),
-    }
+    indicator_cols = ["atr14", "ema20", "ema50"]
+    indicators = dict(zip(indicator_cols, _last_values(features_df, indicator_cols)))
+
+    event_arr = features_df["structure_event"].to_numpy(dtype=object)
+    event_positions = np.flatnonzero(pd.notna(event_arr))
 
-    events = features_df["structure_event"].dropna()
-    last_event = None
-    if not events.empty:
-        idx = events.index[-1]
-        last_event = _format_last_event(features_df, str(events.iloc[-1]), idx, asof_index)
+    # เดินย้อนจาก event ล่าสุดรอบเดียว หยุดทันทีที่เจอทั้ง BOS และ CHOCH
+    last_pos: Dict[str, int | None] = {"BOS": None, "CHOCH": None}
+    for pos in event_positions[::-1].tolist():
+        kind = str(event_arr[pos]).split("_", 1)[0]
+        if kind in last_pos and last_pos[kind] is None:
+            last_pos[kind] = pos
+            if last_pos["BOS"] is not None and last_pos["CHOCH"] is not None:
+                break
 
-    bos_events = events[events.str.startswith("BOS")]
-    last_bos = None
-    if not bos_events.empty:
-        idx = bos_events.index[-1]
-        last_bos = _format_last_event(features_df, str(bos_events.iloc[-1]), idx, asof_index)
+    def last_event_at(pos: int | None) -> Dict[str, Any] | None:
+        if pos is None:
+            return None
+        return _format_last_event(event_arr[pos], pos, asof_index, iso_times, closes)
 
-    choch_events = events[events.str.startswith("CHOCH")]
-    last_choch = None
-    if not choch_events.empty:
-        idx = choch_events.index[-1]
-        last_choch = _format_last_event(features_df, str(choch_events.iloc[-1]), idx, asof_index)
+    last_event = last_event_at(int(event_positions[-1]) if event_positions.size else None)
+    last_bos = last_event_at(last_pos["BOS"])
+    last_choch = last_event_at(last_pos["CHOCH"])
 
     structure = {
         "last_event": last_event,
@@ -237,30 +287,30 @@ def _summary_timeframe_payload(
         "last_choch": last_choch,
     }
 
-    prev_levels = {}
-    for key in ["pdh", "pdl", "pdc", "pwh", "pwl", "pwc", "pmh", "pml", "pmc"]:
-        if key in last_features:
-            prev_levels[key] = _safe_float(last_features.get(key))
-    prev_levels = {k: v for k, v in prev_levels.items() if v is not None}
+    columns_present = set(features_df.columns)
+    prev_keys = [key for key in PREV_LEVEL_KEYS if key in columns_present]
+    prev_levels = {key: value for key, value in zip(prev_keys, _last_values(features_df, prev_keys)) if value is not None}
 
-    positioning = _build_positioning_atr(last_features, prev_levels)
+    atr = indicators["atr14"]
+    price_now = _safe_float(closes[-1])
+    ema20 = indicators["ema20"]
+    ema50 = indicators["ema50"]
+    positioning = _build_positioning_atr(price_now, atr, prev_levels, {"ema20": ema20, "ema50": ema50})
 
     notes_flags = {
-        "sweep_prev_high": _safe_int(last_features.get("sweep_prev_high")) or 0,
-        "sweep_prev_low": _safe_int(last_features.get("sweep_prev_low")) or 0,
+        key: (_safe_int(features_df[key].iat[-1]) if key in features_df.columns else None) or 0
+        for key in ("sweep_prev_high", "sweep_prev_low")
     }
 
     swing_window_map = {"D1": 120, "H4": 30}
     window_days = swing_window_map.get(timeframe, 60)
     max_distance_atr = 3.0
     max_ranked_levels = 15
-    atr = _safe_float(last_features.get("atr14"))
-    price_now = _safe_float(last_features.get("close"))
 
     swings_recent = {
         "window_days": window_days,
-        "highs": _collect_swings_recent(features_df, "swing_high", "high", asof_time, window_days),
-        "lows": _collect_swings_recent(features_df, "swing_low", "low", asof_time, window_days),
+        "highs": _collect_swings_recent(features_df, "swing_high", "high", asof_time, window_days, iso_times),
+        "lows": _collect_swings_recent(features_df, "swing_low", "low", asof_time, window_days, iso_times),
     }
 
     swings_nearest = None
@@ -276,6 +326,7 @@ def _summary_timeframe_payload(
                 price_now,
                 atr,
                 max_distance_atr,
+                iso_times,
                 price_filter=lambda price: price >= price_now,
             ),
             "support_lows_nearest": _collect_swings_nearest(
@@ -286,6 +337,7 @@ def _summary_timeframe_payload(
                 price_now,
                 atr,
                 max_distance_atr,
+                iso_times,
                 price_filter=lambda price: price <= price_now,
             ),
         }
@@ -295,6 +347,7 @@ def _summary_timeframe_payload(
             "high",
             asof_time,
             window_days,
+            iso_times,
             price_filter=lambda price: price >= price_now,
         )
         swings_recent["support_lows_recent"] = _collect_swings_recent(
@@ -303,13 +356,13 @@ def _summary_timeframe_payload(
             "low",
             asof_time,
             window_days,
+            iso_times,
             price_filter=lambda price: price <= price_now,
         )
 
     key_levels_ranked = []
     if atr and price_now:
         recency_distance_atr = 1.5
-        ema20 = _safe_float(last_features.get("ema20"))
         if ema20 is not None:
             key_levels_ranked.append(
                 {
@@ -319,7 +372,6 @@ def _summary_timeframe_payload(
                     "age_days": 0,
                 }
             )
-        ema50 = _safe_float(last_features.get("ema50"))
         if ema50 is not None:
             key_levels_ranked.append(
                 {
@@ -339,65 +391,65 @@ def _summary_timeframe_payload(
             key_levels_ranked.append(
                 {
                     "type": str(level_key).upper(),
-                    "level": _safe_float(level_value),
+                    "level": level_value,
                     "distance_atr": abs(float(level_value) - price_now) / atr,
                     "age_days": age_days,
                 }
             )
 
-        for event in [last_bos, last_choch]:
+        for event, pos in [(last_bos, last_pos["BOS"]), (last_choch, last_pos["CHOCH"])]:
             if not event:
                 continue
-            event_time = pd.Timestamp(event["time_th"])
             key_levels_ranked.append(
                 {
                     "type": event["type"],
                     "level": event["level_close"],
                     "distance_atr": abs(float(event["level_close"]) - price_now) / atr,
-                    "age_days": _age_days(asof_time, event_time),
+                    "age_days": int(age_days_all[pos]),
                 }
             )
 
-        for flag_col, price_col, level_type in [
-            ("swing_high", "high", "SWING_HIGH"),
-            ("swing_low", "low", "SWING_LOW"),
+        for flag_col, price_col, level_type, side_filter in [
+            ("swing_high", "high", "SWING_HIGH", lambda prices: prices >= price_now),
+            ("swing_low", "low", "SWING_LOW", lambda prices: prices <= price_now),
         ]:
-            swings = features_df.loc[features_df[flag_col] == 1, ["time_th", price_col]]
-            for _, row in swings.iterrows():
-                price = _safe_float(row[price_col])
-                if price is None:
-                    continue
-                if level_type == "SWING_HIGH" and price < price_now:
-                    continue
-                if level_type == "SWING_LOW" and price > price_now:
-                    continue
-                time_th = pd.Timestamp(row["time_th"])
-                age_days = _age_days(asof_time, time_th)
-                distance_atr = abs(price - price_now) / atr
-                if age_days > window_days and distance_atr > recency_distance_atr:
-                    continue
-                key_levels_ranked.append(
-                    {
-                        "type": level_type,
-                        "level": price,
-                        "distance_atr": distance_atr,
-                        "age_days": age_days,
-                    }
+            positions, prices = _swing_positions(features_df, flag_col, price_col, side_filter)
+            age_days = age_days_all[positions]
+            distance_atr = np.abs(prices - price_now) / atr
+            # เก่ากว่า window จะเก็บไว้เฉพาะตัวที่อยู่ใกล้ (distance_atr <= recency_distance_atr)
+            keep = ~((age_days > window_days) & (distance_atr > recency_distance_atr))
+            key_levels_ranked.extend(
+                {
+                    "type": level_type,
+                    "level": level,
+                    "distance_atr": distance,
+                    "age_days": age,
+                }
+                for level, distance, age in zip(
+                    prices[keep].tolist(), distance_atr[keep].tolist(), age_days[keep].tolist()
                 )
+            )
 
-        key_levels_ranked.sort(key=lambda item: (item["distance_atr"], item["age_days"]))
-        key_levels_ranked_near = [
-            item
-            for item in key_levels_ranked
-            if item["distance_atr"] <= max_distance_atr and item["age_days"] <= window_days
-        ][:max_ranked_levels]
-        key_levels_ranked_far = [
-            item
-            for item in key_levels_ranked
-            if item["distance_atr"] > max_distance_atr and item["age_days"] <= window_days
-        ][:max_ranked_levels]
+        size = len(key_levels_ranked)
+        distance_arr = np.fromiter((item["distance_atr"] for item in key_levels_ranked), dtype=np.float64, count=size)
+        age_arr = np.fromiter((item["age_days"] for item in key_levels_ranked), dtype=np.int64, count=size)
+        # lexsort (stable) เรียง distance_atr แล้ว age_days = ลำดับเดียวกับ sort(key=(distance, age))
+        order = np.lexsort((age_arr, distance_arr))
+        in_window = age_arr[order] <= window_days
+        sorted_distance = distance_arr[order]
+        near_order = order[in_window & (sorted_distance <= max_distance_atr)][:max_ranked_levels]
+        far_order = order[in_window & (sorted_distance > max_distance_atr)][:max_ranked_levels]
+        key_levels_ranked_near = [key_levels_ranked[i] for i in near_order.tolist()]
+        key_levels_ranked_far = [key_levels_ranked[i] for i in far_order.tolist()]
         key_levels_ranked = key_levels_ranked_near
 
+    has_recent = bool(
+        swings_recent["highs"]
+        or swings_recent["lows"]
+        or swings_recent.get("resistance_highs_recent")
+        or swings_recent.get("support_lows_recent")
+    )
+
     payload = {
         "lookback_bars": bars,
         "last_bar": last_bar,
@@ -406,11 +458,7 @@ def _summary_timeframe_payload(
     }
     if prev_levels:
         payload["prev_levels"] = prev_levels
-    if any(
-        value
-        for key, value in swings_recent.items()
-        if key != "window_days"
-    ):
+    if has_recent:
         payload["swings_recent"] = swings_recent
     if swings_nearest and (swings_nearest["resistance_highs_nearest"] or swings_nearest["support_lows_nearest"]):
         payload["swings_nearest"] = swings_nearest
@@ -433,6 +481,7 @@ def build_bias_summary(
     pivot_right: int,
     bars_lookup: Dict[str, int],
     timezone: str,
+    precomputed_features: Dict[str, pd.DataFrame] | None = None,
 ) -> Dict[str, Any] | None:
     timeframes_payload: Dict[str, Any] = {}
     asof_time: pd.Timestamp | None = None
@@ -443,7 +492,10 @@ def build_bias_summary(
         if raw_df is None or raw_df.empty:
             continue
         prev_period = feature_item.get("prev_period")
-        features_df = compute_features(raw_df, pivot_left, pivot_right, prev_period=prev_period)
+        # ใช้ features ที่คำนวณไว้ตอน fetch (raw_df/pivot/prev_period ชุดเดียวกัน) ถ้ามี
+        features_df = (precomputed_features or {}).get(timeframe)
+        if features_df is None:
+            features_df = compute_features(raw_df, pivot_left, pivot_right, prev_period=prev_period)
         timeframes_payload[timeframe] = _summary_timeframe_payload(
             timeframe,
             raw_df,
@@ -516,19 +568,26 @@ def validate_ohlc(df: pd.DataFrame, cfg: Dict[str, Any]) -> None:
     max_price = float(cfg["validation"]["max_price"])
     max_missing_ratio = float(cfg["validation"]["max_missing_ratio"])
 
-    for c in ["open", "high", "low", "close"]:
-        miss = float(df[c].isna().mean())
+    # stack OHLC เป็น array เดียว แล้ว reduce ทีละ check ตาม axis (ไม่ scan ทีละ column ซ้ำหลายรอบ)
+    price_cols = ["open", "high", "low", "close"]
+    arr = df[price_cols].to_numpy(dtype=np.float64)
+    missing_ratio = np.isnan(arr).mean(axis=0)
+    non_positive = (arr <= 0).any(axis=0)
+    out_of_range = ((arr < min_price) | (arr > max_price)).any(axis=0)
+    for i, c in enumerate(price_cols):
+        miss = float(missing_ratio[i])
         if miss > max_missing_ratio:
             raise ValueError(f"Too many missing values in {c}: {miss:.4f} > {max_missing_ratio}")
-        if (df[c] <= 0).any():
+        if non_positive[i]:
             raise ValueError(f"Non-positive prices in {c}")
-        if (df[c] < min_price).any() or (df[c] > max_price).any():
+        if out_of_range[i]:
             raise ValueError(f"Price out of range in {c} (expected {min_price}..{max_price})")
 
     # OHLC containment
-    if not ((df["low"] <= df["open"]) & (df["open"] <= df["high"])).all():
+    o, h, l, c = arr.T
+    if not ((l <= o) & (o <= h)).all():
         raise ValueError("OHLC containment failed for open")
-    if not ((df["low"] <= df["close"]) & (df["close"] <= df["high"])).all():
+    if not ((l <= c) & (c <= h)).all():
         raise ValueError("OHLC containment failed for close")
 
     # time monotonic
@@ -539,9 +598,17 @@ def validate_ohlc(df: pd.DataFrame, cfg: Dict[str, Any]) -> None:
 def load_cache_csv(path: Path) -> pd.DataFrame | None:
     if not path.exists():
         return None
-    df = pd.read_csv(path)
+    try:
+        # pyarrow CSV reader (multi-threaded) ถ้ามีติดตั้ง; dtype ยังเป็น numpy ปกติ
+        df = pd.read_csv(path, engine="pyarrow")
+    except ImportError:  # pragma: no cover - pyarrow is optional
+        df = pd.read_csv(path)
     if "time_th" in df.columns:
-        df["time_th"] = pd.to_datetime(df["time_th"])
+        time_th = pd.to_datetime(df["time_th"])
+        # pyarrow parse ISO string ที่มี offset ให้เองเป็น UTC -> แปลงกลับเป็นเวลาไทยเหมือน path เดิม
+        if str(time_th.dt.tz) == "UTC":
+            time_th = time_th.dt.tz_convert(TH_TZ)
+        df["time_th"] = time_th
     elif "time_utc" in df.columns:
         df["time_th"] = pd.to_datetime(df["time_utc"], utc=True).dt.tz_convert("Asia/Bangkok")
         df = df.drop(columns=["time_utc"])
@@ -552,25 +619,51 @@ def save_csv(df: pd.DataFrame, path: Path) -> None:
     """
     Always overwrites OHLC files (as requested). We store time_th as ISO-TH string.
     """
-    out = df.copy()
-    out["time_th"] = out["time_th"].dt.strftime("%Y-%m-%dT%H:%M:%S%z")
-    out.to_csv(path, index=False)
+    # ให้ to_csv format datetime ตอนเขียนเลย ไม่ต้อง copy frame เพื่อแปลง time_th เป็น string ก่อน
+    df.to_csv(path, index=False, date_format="%Y-%m-%dT%H:%M:%S%z")
 
 
 def save_feature_csv(df: pd.DataFrame, path: Path) -> None:
-    out = df.copy()
-    if "time_th" in out.columns:
-        out["time_th"] = out["time_th"].dt.strftime("%Y-%m-%dT%H:%M:%S%z")
-    out.to_csv(path, index=False)
+    df.to_csv(path, index=False, date_format="%Y-%m-%dT%H:%M:%S%z")
+
+
+def _save_frame(df: pd.DataFrame, path: Path, output_format: str, feature: bool = False) -> None:
+    if output_format == "parquet":
+        save_parquet(df, path)
+    elif output_format == "json":
+        save_json(df, path)
+    elif feature:
+        save_feature_csv(df, path)
+    else:
+        save_csv(df, path)
+
+
+def _load_cache(
+    data_dir: Path,
+    symbol: str,
+    file_label: str,
+    output_format: str,
+    timeframe_label: str | None,
+) -> pd.DataFrame | None:
+    cache_path = find_latest_cache(data_dir, symbol, file_label, output_format, timeframe_label)
+    if not cache_path:
+        return None
+    if output_format == "parquet":
+        return load_parquet(cache_path)
+    if output_format == "json":
+        return load_cache_json(cache_path)
+    return load_cache_csv(cache_path)
 
 
 def format_timeframe_label(timeframe: str) -> str:
     tf = timeframe.upper()
-    digits = "".join(ch for ch in tf if ch.isdigit())
-    letters = "".join(ch for ch in tf if ch.isalpha())
+    match = _TF_RE.match(tf)
+    if not match:
+        return tf
+    letters, digits = match.groups()
     if letters == "MN":
         letters = "M"
-    return f"{digits}{letters}" if digits and letters else tf
+    return f"{digits}{letters}"
 
 
 def run_fetch_pipeline(cfg: Dict[str, Any], logger, base_dir: Path) -> Dict[str, Any]:
@@ -598,10 +691,17 @@ def run_fetch_pipeline(cfg: Dict[str, Any], logger, base_dir: Path) -> Dict[str,
     symbols: List[str] = cfg.get("symbols", ["EURUSD"])
     fetch_cfg = cfg.get("fetch", {}) or {}
     store_time_as_th_default = bool(fetch_cfg.get("store_time_as_th", True))
+    # "float32" ลด memory/bandwidth ของ OHLC + indicator (ewm) แลกกับ precision; default float64
+    price_dtype = str(fetch_cfg.get("price_dtype", "float64")).lower()
+    if price_dtype not in PRICE_DTYPES:
+        raise ValueError(f"Unsupported fetch.price_dtype: {price_dtype!r}. Use one of {list(PRICE_DTYPES)}")
     feature_cfg = cfg.get("features", {}) or {}
     output_format = str(cfg.get("output", {}).get("format", "csv")).lower()
     if output_format == "cvs":
         output_format = "csv"
+    if output_format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        logger.warning("output.format=parquet requires pyarrow; falling back to json.")
+        output_format = "json"
     file_label_default = str(cfg.get("output", {}).get("file_label", "data"))
     timeframe_configs = fetch_cfg.get("timeframes")
     if timeframe_configs:
@@ -636,6 +736,7 @@ def run_fetch_pipeline(cfg: Dict[str, Any], logger, base_dir: Path) -> Dict[str,
     stale_sources: List[str] = []
     statuses: Dict[str, SourceStatus] = {}
     raw_frames: Dict[str, Dict[str, pd.DataFrame]] = {sym: {} for sym in symbols}
+    features_frames: Dict[str, Dict[str, pd.DataFrame]] = {sym: {} for sym in symbols}
     feature_files_by_symbol: Dict[str, Dict[str, str]] = {sym: {} for sym in symbols}
 
     # --- CONNECT ---
@@ -656,13 +757,7 @@ def run_fetch_pipeline(cfg: Dict[str, Any], logger, base_dir: Path) -> Dict[str,
                 timeframe = spec["timeframe"]
                 file_label = spec["file_label"]
                 timeframe_label = format_timeframe_label(timeframe)
-                cache_path = find_latest_cache(data_dir, sym, file_label, output_format, timeframe_label)
-                if cache_path and output_format == "json":
-                    cache_df = load_cache_json(cache_path)
-                elif cache_path:
-                    cache_df = load_cache_csv(cache_path)
-                else:
-                    cache_df = None
+                cache_df = _load_cache(data_dir, sym, file_label, output_format, timeframe_label)
                 key = f"{sym}_{timeframe}"
                 if cache_df is not None and len(cache_df) > 0:
                     latest = pd.to_datetime(cache_df["time_th"].iloc[-1]).strftime("%Y-%m-%dT%H:%M:%S%z")
@@ -679,9 +774,9 @@ def run_fetch_pipeline(cfg: Dict[str, Any], logger, base_dir: Path) -> Dict[str,
         }
 
         # Write latest + archive manifest
-        atomic_write_json(manifest_path_latest, manifest)
+        atomic_write_json(manifest_path_latest, manifest, fsync=True)
         if keep_run_manifest:
-            atomic_write_json(manifest_path_archive, manifest)
+            atomic_write_json(manifest_path_archive, manifest, fsync=True)
 
         # Write error report (dated)
         if keep_error_report:
@@ -707,25 +802,26 @@ def run_fetch_pipeline(cfg: Dict[str, Any], logger, base_dir: Path) -> Dict[str,
             output_path = data_dir / filename
             try:
                 logger.info(f"Fetching {sym} {timeframe} ({bars} bars)...")
-                res = mt5c.fetch_rates(sym, timeframe, bars, store_time_as_th=store_time_as_th)
+                res = mt5c.fetch_rates(
+                    sym,
+                    timeframe,
+                    bars,
+                    store_time_as_th=store_time_as_th,
+                    price_dtype=price_dtype,
+                )
                 validate_ohlc(res.df, cfg)
-                if output_format == "json":
-                    save_json(res.df, output_path)
-                else:
-                    save_csv(res.df, output_path)
+                _save_frame(res.df, output_path, output_format)
                 raw_frames[sym][timeframe] = res.df
                 feature_item = feature_timeframes.get(timeframe, {})
                 feature_columns = feature_item.get("columns")
                 if feature_columns:
                     prev_period = feature_item.get("prev_period")
                     features_df = compute_features(res.df, pivot_left, pivot_right, prev_period=prev_period)
+                    features_frames[sym][timeframe] = features_df
                     selected = select_feature_columns(features_df, feature_columns)
                     feature_filename = build_feature_filename(sym, feature_label, output_format, timestamp, timeframe_label)
                     feature_path = data_dir / feature_filename
-                    if output_format == "json":
-                        save_json(selected, feature_path)
-                    else:
-                        save_feature_csv(selected, feature_path)
+                    _save_frame(selected, feature_path, output_format, feature=True)
                     logger.info(f"Saved {feature_path} rows={len(selected)}")
                     feature_files_by_symbol[sym][timeframe] = feature_filename
                 statuses[f"{sym}_{timeframe}"] = SourceStatus(
@@ -738,13 +834,7 @@ def run_fetch_pipeline(cfg: Dict[str, Any], logger, base_dir: Path) -> Dict[str,
                 logger.info(f"Saved {output_path} rows={res.rows} latest={res.latest_time_th}")
             except Exception as e:
                 logger.error(f"Fetch {sym} {timeframe} failed: {e}")
-                cache_path = find_latest_cache(data_dir, sym, file_label, output_format, timeframe_label)
-                if cache_path and output_format == "json":
-                    cache_df = load_cache_json(cache_path)
-                elif cache_path:
-                    cache_df = load_cache_csv(cache_path)
-                else:
-                    cache_df = None
+                cache_df = _load_cache(data_dir, sym, file_label, output_format, timeframe_label)
                 key = f"{sym}_{timeframe}"
                 if cache_df is not None and len(cache_df) > 0:
                     latest = pd.to_datetime(cache_df["time_th"].iloc[-1]).strftime("%Y-%m-%dT%H:%M:%S%z")
@@ -782,10 +872,10 @@ def run_fetch_pipeline(cfg: Dict[str, Any], logger, base_dir: Path) -> Dict[str,
     }
 
     # Always overwrite latest manifest
-    atomic_write_json(manifest_path_latest, manifest)
+    atomic_write_json(manifest_path_latest, manifest, fsync=True)
     # Archive manifest with date suffix
     if keep_run_manifest:
-        atomic_write_json(manifest_path_archive, manifest)
+        atomic_write_json(manifest_path_archive, manifest, fsync=True)
 
     logger.info(f"Wrote manifest latest: {manifest_path_latest}")
     if keep_run_manifest:
@@ -798,8 +888,9 @@ def run_fetch_pipeline(cfg: Dict[str, Any], logger, base_dir: Path) -> Dict[str,
         summary_timestamp = timestamp_th_compact_with_t()
         timezone = str(cfg.get("app", {}).get("timezone", "Asia/Bangkok"))
         bars_lookup = {spec["timeframe"]: spec["bars"] for spec in fetch_specs}
-        for sym in symbols:
-            summary_payload = build_bias_summary(
+
+        def summarize(sym: str) -> Dict[str, Any] | None:
+            return build_bias_summary(
                 sym,
                 raw_frames.get(sym, {}),
                 feature_timeframes,
@@ -808,7 +899,15 @@ def run_fetch_pipeline(cfg: Dict[str, Any], logger, base_dir: Path) -> Dict[str,
                 pivot_right,
                 bars_lookup,
                 timezone,
+                precomputed_features=features_frames.get(sym),
             )
+
+        # คำนวณ summary แต่ละ symbol แบบขนาน (อิสระต่อกัน); เขียนไฟล์ตามลำดับ symbols บน main thread
+        max_workers = max(1, min(len(symbols), os.cpu_count() or 1))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            summaries = list(executor.map(summarize, symbols))
+
+        for sym, summary_payload in zip(symbols, summaries):
             if not summary_payload:
                 continue
             suffix = f"_{sym.lower()}" if len(symbols) > 1 else ""
@@ -1,52 +1,136 @@
 from __future__ import annotations
-import os, json, time, logging
+import copy, os, re, json, time, logging
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict
 
-import yaml
-import pandas as pd
 from zoneinfo import ZoneInfo
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback to stdlib json
+    orjson = None
+
 
 TH_TZ = ZoneInfo("Asia/Bangkok")
+_LOGGERS: Dict[str, tuple[Path, logging.Logger]] = {}
+_NOW_TH_WINDOW_SECONDS = 0.5
+_now_th_cache: tuple[float, datetime | None] = (float("-inf"), None)
+
+
+def _now_th() -> datetime:
+    # snapshot เวลาไทยใช้ซ้ำภายใน 0.5s (ใช้ตั้งชื่อไฟล์/label เท่านั้น ไม่ได้ใช้เรียงลำดับ event)
+    global _now_th_cache
+    t = time.monotonic()
+    cached_at, cached_now = _now_th_cache
+    if cached_now is not None and t - cached_at < _NOW_TH_WINDOW_SECONDS:
+        return cached_now
+    now = datetime.now(TH_TZ)
+    _now_th_cache = (t, now)
+    return now
 
 
 def date_th_compact() -> str:
     # YYYYMMDD (TH)
-    return datetime.now(TH_TZ).strftime("%Y%m%d")
+    return _now_th().strftime("%Y%m%d")
 
 
 def timestamp_th_compact() -> str:
     # DDMMYY_HHMM (TH)
-    return datetime.now(TH_TZ).strftime("%d%m%y_%H%M")
+    return _now_th().strftime("%d%m%y_%H%M")
 
 
 def timestamp_th_compact_with_t() -> str:
     # DDMMYYTHHMM (TH)
-    return datetime.now(TH_TZ).strftime("%d%m%yT%H%M")
+    return _now_th().strftime("%d%m%yT%H%M")
+
+
+
+# ${VAR} ใน string ของ config -> ค่าจาก environment (ไม่มีตัวแปรก็คงข้อความเดิมไว้)
+_ENV_RE = re.compile(r"\$\{([^}]+)\}")
+
+
+@lru_cache(maxsize=32)
+def _parse_yaml_file(path: str, mtime_ns: int, size: int) -> tuple[Dict[str, Any], bool]:
+    # key รวม mtime/size: ไฟล์ถูกแก้เมื่อไหร่ก็ parse ใหม่; คืน flag ว่ามี "${" ในไฟล์หรือไม่ด้วย
+    # ส่ง bytes ให้ libyaml ตรงๆ (ไม่ต้อง decode เป็น str ใน Python ก่อน)
+    import yaml  # import ตอนใช้จริง (ไม่ถ่วง startup ของ script ที่ไม่ได้อ่าน config)
+
+    raw = Path(path).read_bytes()
+    # libyaml (C) loader ถ้า PyYAML build มาพร้อม libyaml; ไม่งั้นใช้ SafeLoader ปกติ
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml.load(raw, Loader=loader), b"${" in raw
+
+
+def _interpolate_env(value: Any) -> Any:
+    if isinstance(value, str):
+        if "${" not in value:
+            return value
+        return _ENV_RE.sub(lambda m: os.environ.get(m.group(1).strip(), m.group(0)), value)
+    if isinstance(value, dict):
+        return {k: _interpolate_env(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_interpolate_env(v) for v in value]
+    return value
+
 
 def load_config(path: str) -> Dict[str, Any]:
-    load_env_file(Path(path).resolve().parent)
-    with open(path, "r", encoding="utf-8") as f:
-        cfg = yaml.safe_load(f)
+    resolved = Path(path).resolve()
+    load_env_file(resolved.parent)
+    st = resolved.stat()
+    parsed, has_placeholders = _parse_yaml_file(str(resolved), st.st_mtime_ns, st.st_size)
+    # ไม่มี "${" ในไฟล์เลย -> ข้าม interpolation ทั้งหมด
+    if has_placeholders:
+        cfg = _interpolate_env(parsed)
+    else:
+        # deepcopy: apply_env_overrides/caller แก้ dict ได้โดยไม่กระทบตัวที่ cache ไว้
+        cfg = copy.deepcopy(parsed)
     return apply_env_overrides(cfg)
 
 
-def load_env_file(start_dir: Path) -> None:
+@lru_cache(maxsize=8)
+def _parse_env_file(path: str, mtime_ns: int, size: int) -> tuple[tuple[str, str], ...]:
+    values: Dict[str, str] = {}
+    for raw_line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = raw_line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        key = key.strip()
+        value = value.strip().strip('"').strip("'")
+        if key:
+            values[key] = value
+    return tuple(values.items())
+
+
+# start_dir -> .env ที่เจอ (หรือ None) เดิน parent หาแค่ครั้งแรกต่อ start_dir
+_ENV_FILE_CACHE: Dict[Path, Path | None] = {}
+
+
+def _find_env_file(start_dir: Path) -> Path | None:
+    if start_dir in _ENV_FILE_CACHE:
+        return _ENV_FILE_CACHE[start_dir]
+    found = None
     for parent in (start_dir, *start_dir.parents):
         env_path = parent / ".env"
         if env_path.exists():
-            for raw_line in env_path.read_text(encoding="utf-8").splitlines():
-                line = raw_line.strip()
-                if not line or line.startswith("#") or "=" not in line:
-                    continue
-                key, value = line.split("=", 1)
-                key = key.strip()
-                value = value.strip().strip('"').strip("'")
-                if key:
-                    os.environ[key] = value
+            found = env_path
             break
+    _ENV_FILE_CACHE[start_dir] = found
+    return found
+
+
+def load_env_file(start_dir: Path) -> None:
+    env_path = _find_env_file(start_dir)
+    if env_path is None:
+        return
+    try:
+        st = env_path.stat()
+    except FileNotFoundError:
+        _ENV_FILE_CACHE.pop(start_dir, None)
+        return
+    os.environ.update(_parse_env_file(str(env_path), st.st_mtime_ns, st.st_size))
 
 
 def apply_env_overrides(cfg: Dict[str, Any]) -> Dict[str, Any]:
@@ -73,18 +157,39 @@ def ensure_dir(p: str | Path) -> Path:
 
 
 def th_now_iso() -> str:
-    return datetime.now(TH_TZ).replace(microsecond=0).isoformat()
+    return _now_th().replace(microsecond=0).isoformat()
 
 
-def atomic_write_text(path: Path, text: str) -> None:
+def atomic_write_bytes(path: Path, data: bytes, fsync: bool = False) -> None:
+    # write ก้อนเดียว (unbuffered); fsync เฉพาะไฟล์ที่ต้องการ durability เช่น manifest
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb", buffering=0) as f:
+        f.write(data)
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def atomic_write_json(path: Path, payload: Any, fsync: bool = False) -> None:
+    if orjson is not None:
+        data = orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        atomic_write_bytes(path, data, fsync=fsync)
+        return
+    # stream ลง temp file ตรงๆ (ไม่สร้าง string ทั้งก้อนใน memory ก่อน)
     tmp = path.with_suffix(path.suffix + ".tmp")
-    tmp.write_text(text, encoding="utf-8")
-    tmp.replace(path)
+    with open(tmp, "w", encoding="utf-8", buffering=1 << 20) as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
 
 
-def atomic_write_json(path: Path, payload: Dict[str, Any]) -> None:
-    text = json.dumps(payload, ensure_ascii=False, indent=2)
-    atomic_write_text(path, text)
+def read_json(path: Path) -> Any:
+    # orjson parse จาก bytes ตรงๆ (ไม่ต้อง decode เป็น str ก่อน)
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_text(encoding="utf-8"))
 
 
 def build_output_filename(
@@ -111,17 +216,41 @@ def build_feature_filename(
     return f"{prefix}feature_{symbol.lower()}_{label}_{timestamp}.{ext}"
 
 
+@lru_cache(maxsize=None)
+def _pyarrow():
+    # pyarrow เป็น optional และ import หนัก -> import ครั้งแรกที่ต้องใช้
+    try:
+        import pyarrow
+    except ImportError:  # pragma: no cover - pyarrow is optional
+        return None
+    return pyarrow
+
+
 def save_json(df, path: Path) -> None:
-    out = df.copy()
-    out["time_th"] = out["time_th"].dt.strftime("%Y-%m-%dT%H:%M:%S%z")
-    payload = out.to_dict(orient="records")
-    atomic_write_text(path, json.dumps(payload, ensure_ascii=False, indent=2))
+    # assign คืน frame ใหม่โดยไม่ deep-copy คอลัมน์อื่น (ต่างจาก df.copy())
+    out = df.assign(time_th=df["time_th"].dt.strftime("%Y-%m-%dT%H:%M:%S%z"))
+    pa = _pyarrow()
+    if pa is not None:
+        # Arrow แปลงเป็น list[dict] ใน C (เร็วกว่า to_dict records); NaN -> null เหมือนที่ orjson เขียน
+        payload = pa.Table.from_pandas(out, preserve_index=False).to_pylist()
+    else:
+        payload = out.to_dict(orient="records")
+    atomic_write_json(path, payload)
+
+
+def save_parquet(df, path: Path) -> None:
+    # binary cache: เก็บ time_th เป็น tz-aware timestamp ตรงๆ ไม่ต้อง strftime/parse ไปกลับ
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    df.to_parquet(tmp, engine="pyarrow", compression="zstd", index=False)
+    os.replace(tmp, path)
 
 
 def load_cache_json(path: Path):
     if not path.exists():
         return None
-    payload = json.loads(path.read_text(encoding="utf-8"))
+    import pandas as pd
+
+    payload = read_json(path)
     df = pd.DataFrame(payload)
     if "time_th" in df.columns:
         df["time_th"] = pd.to_datetime(df["time_th"])
@@ -131,6 +260,14 @@ def load_cache_json(path: Path):
     return df
 
 
+def load_parquet(path: Path):
+    if not path.exists():
+        return None
+    import pandas as pd
+
+    return pd.read_parquet(path, engine="pyarrow")
+
+
 def find_latest_cache(
     data_dir: Path,
     symbol: str,
@@ -139,20 +276,42 @@ def find_latest_cache(
     timeframe_label: str | None = None,
 ) -> Path | None:
     prefix = f"{timeframe_label}_" if timeframe_label else ""
-    pattern = f"{prefix}raw_{symbol.lower()}_{label}_*.{ext}"
-    candidates = list(data_dir.glob(pattern))
-    if not candidates:
+    # เทียบ pattern "<head>*<suffix>" ด้วย startswith/endswith ใน scandir รอบเดียว (แทน glob + stat ทีละไฟล์)
+    head = f"{prefix}raw_{symbol.lower()}_{label}_"
+    suffix = f".{ext}"
+    min_len = len(head) + len(suffix)
+    latest_path = None
+    latest_mtime = -1
+    try:
+        with os.scandir(data_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if len(name) < min_len or not name.startswith(head) or not name.endswith(suffix):
+                    continue
+                mtime = entry.stat().st_mtime_ns
+                if mtime > latest_mtime:
+                    latest_mtime = mtime
+                    latest_path = entry.path
+    except FileNotFoundError:
         return None
-    return max(candidates, key=lambda p: p.stat().st_mtime)
+    return Path(latest_path) if latest_path is not None else None
 
 
 def setup_logger(logs_dir: Path, name: str = "fetch") -> logging.Logger:
+    log_file = Path(logs_dir).resolve() / f"{name}_{_now_th().strftime('%Y%m%d')}.log"
+    # getLogger(name) คืน object เดียวกันเสมอ -> cache ต่อ name; rebuild handler เฉพาะเมื่อไฟล์ log เปลี่ยน (logs_dir อื่น/ข้ามวัน)
+    cached = _LOGGERS.get(name)
+    if cached is not None and cached[0] == log_file:
+        return cached[1]
+
     ensure_dir(logs_dir)
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
+    for handler in logger.handlers:
+        handler.close()
     logger.handlers.clear()
+    logger.propagate = False
 
-    log_file = logs_dir / f"{name}_{datetime.now(TH_TZ).strftime('%Y%m%d')}.log"
     fh = logging.FileHandler(log_file, encoding="utf-8")
     fh.setLevel(logging.INFO)
 
@@ -165,6 +324,7 @@ def setup_logger(logs_dir: Path, name: str = "fetch") -> logging.Logger:
 
     logger.addHandler(fh)
     logger.addHandler(sh)
+    _LOGGERS[name] = (log_file, logger)
     return logger
 
 
@@ -1,8 +1,32 @@
 # telegram_notifier.py
 from __future__ import annotations
 
-import requests
-from typing import Any, Dict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict
+
+if TYPE_CHECKING:
+    import requests
+
+
+@lru_cache(maxsize=1)
+def _session() -> requests.Session:
+    # keep-alive ต่อ api.telegram.org ทั้ง process + retry อัตโนมัติเมื่อโดน 429/5xx (เคารพ Retry-After)
+    # import requests ตอนส่งจริงครั้งแรก: ถ้า telegram ปิดอยู่ก็ไม่ต้องโหลดเลย
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("POST",),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
 
 
 def _bool(v: Any, default: bool = False) -> bool:
@@ -38,7 +62,7 @@ def send_telegram_message(cfg: Dict[str, Any], text: str, logger=None) -> None:
     }
 
     try:
-        r = requests.post(url, data=payload, timeout=20)
+        r = _session().post(url, data=payload, timeout=(5, 20))
         if not r.ok and logger:
             detail = r.text
             try:
@@ -95,57 +119,54 @@ def format_manifest_message(manifest: Dict[str, Any]) -> str:
         head = "❌ <b>MT5 Fetch: ERROR</b>"
 
     lines = [head, f"<b>{asof_label}</b>: {asof}"]
+    lines_append = lines.append
 
     sources = manifest.get("sources", {}) or {}
-    if isinstance(sources, dict) and sources:
-        lines.append("<b>Sources</b>:")
+    if not isinstance(sources, dict):
+        sources = {}
+    if sources:
+        lines_append("<b>Sources</b>:")
         for k, v in sources.items():
-            ok = v.get("ok")
-            rows = v.get("rows")
-            latest = v.get("latest_time") or v.get("latest")
-            used_cache = v.get("used_cache")
-            error = (v.get("error") or "").strip()
+            get = v.get
+            ok = get("ok")
+            error = (get("error") or "").strip()
             if ok and error:
                 tag = "WARN"
             elif ok:
                 tag = "OK"
             else:
                 tag = "FAIL"
-            cache = " (cache)" if used_cache else ""
-            lines.append(f"• {k}: {tag}{cache}, rows={rows}, latest={latest}")
+            cache = " (cache)" if get("used_cache") else ""
+            latest = get("latest_time") or get("latest")
+            lines_append(f"• {k}: {tag}{cache}, rows={get('rows')}, latest={latest}")
             if error:
-                lines.append(f"  ↳ error: {error}")
-            day_label = v.get("day")
-            if day_label:
-                raw_rows = v.get("raw_rows")
-                todays_rows = v.get("todays_rows")
-                filtered_today_rows = v.get("filtered_today_rows")
-                other_today_rows = v.get("other_today_rows")
-                other_today_events = v.get("other_today_events")
-                if ok and error:
-                    lines.append(f"  ↳ Recheck failed; using cache for {day_label}.")
-                if raw_rows == 0:
-                    lines.append(f"  ↳ Source returned 0 events for {day_label}.")
-                if filtered_today_rows == 0 and isinstance(todays_rows, int):
-                    lines.append(
-                        f"  ↳ No relevant news for {day_label} (total today={todays_rows})."
-                    )
-                if isinstance(other_today_events, list):
-                    if other_today_events:
-                        lines.append(f"  ↳ Other events on {day_label}:")
-                        for item in other_today_events:
-                            lines.append(f"    - {item}")
-                    elif isinstance(other_today_rows, int):
-                        lines.append(f"  ↳ Other events on {day_label}: none.")
-                elif ok is False:
-                    lines.append(f"  ↳ Other events on {day_label}: unavailable (fetch failed).")
+                lines_append(f"  ↳ error: {error}")
+            day_label = get("day")
+            if not day_label:
+                continue
+            todays_rows = get("todays_rows")
+            other_today_events = get("other_today_events")
+            if ok and error:
+                lines_append(f"  ↳ Recheck failed; using cache for {day_label}.")
+            if get("raw_rows") == 0:
+                lines_append(f"  ↳ Source returned 0 events for {day_label}.")
+            if get("filtered_today_rows") == 0 and isinstance(todays_rows, int):
+                lines_append(f"  ↳ No relevant news for {day_label} (total today={todays_rows}).")
+            if isinstance(other_today_events, list):
+                if other_today_events:
+                    lines_append(f"  ↳ Other events on {day_label}:")
+                    lines_append("\n".join(f"    - {item}" for item in other_today_events))
+                elif isinstance(get("other_today_rows"), int):
+                    lines_append(f"  ↳ Other events on {day_label}: none.")
+            elif ok is False:
+                lines_append(f"  ↳ Other events on {day_label}: unavailable (fetch failed).")
 
     stale = manifest.get("stale_sources", []) or []
     if stale:
-        lines.append(f"<b>stale_sources</b>: {', '.join(stale)}")
+        lines_append(f"<b>stale_sources</b>: {', '.join(stale)}")
 
     notes = (manifest.get("notes") or "").strip()
     if notes:
-        lines.append(f"<b>notes</b>: {notes}")
+        lines_append(f"<b>notes</b>: {notes}")
 
     return "\n".join(lines)
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import argparse
-import json
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+import numpy as np
+
+from _jsonio import read_json, write_json
+
 ART_DIR = Path("artifacts") / "fedwatch"
 LATEST_DIR = ART_DIR / "latest"
 RUNS_DIR = ART_DIR / "runs"
@@ -29,41 +33,44 @@ def _parse_run_dir(args: argparse.Namespace) -> Path:
     return LATEST_DIR
 
 
+@lru_cache(maxsize=256)
 def _rate_mid(rate_range: str) -> float | None:
-    match = re.findall(r"-?\d+(?:\.\d+)?", rate_range)
-    if len(match) >= 2:
-        low = float(match[0])
-        high = float(match[1])
-        return (low + high) / 2
-    return None
+    # "425-450" / "4.25%-4.50%" -> split ที่ '-' ตัวคั่น (ข้าม '-' ตัวแรกถ้าเป็นเครื่องหมายลบ); rate_range ซ้ำทุก meeting -> cache
+    text = rate_range.replace("%", "").replace("\u2013", "-").strip()
+    sep = text.find("-", 1)
+    if sep < 0:
+        return None
+    try:
+        return (float(text[:sep]) + float(text[sep + 1:])) / 2
+    except ValueError:
+        return None
+
+
+def _probs_array(dist: list[dict[str, Any]]) -> np.ndarray:
+    return np.fromiter((float(item.get("prob", 0.0)) for item in dist), dtype=np.float64, count=len(dist))
+
+
+def _mids_array(dist: list[dict[str, Any]]) -> np.ndarray:
+    # parse ไม่ได้ -> NaN (ตัดทิ้งด้วย mask ทีหลัง)
+    return np.fromiter(
+        (np.nan if (mid := _rate_mid(item.get("rate_range", ""))) is None else mid for item in dist),
+        dtype=np.float64,
+        count=len(dist),
+    )
 
 
 def _sum_prob(dist: list[dict[str, Any]]) -> float:
-    return sum(float(item.get("prob", 0.0)) for item in dist)
+    return float(_probs_array(dist).sum())
 
 
-def _compute_prob_groups(distribution: list[dict[str, Any]], current_range: str | None) -> dict[str, float | None]:
-    if not current_range:
-        return {"prob_cut": None, "prob_hold": None, "prob_hike": None}
-    current_mid = _rate_mid(current_range)
+def _compute_prob_groups(mids: np.ndarray, probs: np.ndarray, current_mid: float | None) -> dict[str, float | None]:
     if current_mid is None:
         return {"prob_cut": None, "prob_hold": None, "prob_hike": None}
 
-    prob_cut = 0.0
-    prob_hold = 0.0
-    prob_hike = 0.0
-
-    for item in distribution:
-        mid = _rate_mid(item.get("rate_range", ""))
-        if mid is None:
-            continue
-        prob = float(item.get("prob", 0.0))
-        if mid < current_mid:
-            prob_cut += prob
-        elif mid > current_mid:
-            prob_hike += prob
-        else:
-            prob_hold += prob
+    # NaN เทียบแล้วเป็น False ทุกกรณี -> แถวที่ parse ไม่ได้ไม่ถูกนับ
+    prob_cut = float(probs[mids < current_mid].sum())
+    prob_hike = float(probs[mids > current_mid].sum())
+    prob_hold = float(probs[mids == current_mid].sum())
 
     return {"prob_cut": prob_cut, "prob_hold": prob_hold, "prob_hike": prob_hike}
 
@@ -99,26 +106,24 @@ def main() -> int:
     if not in_raw.exists():
         raise FileNotFoundError(f"Missing input raw.json: {in_raw.resolve()}")
 
-    raw = json.loads(in_raw.read_text(encoding="utf-8"))
+    raw = read_json(in_raw)
     meetings_raw = raw.get("meetings", [])
     current_range = raw.get("current_target_range")
+    current_mid = _rate_mid(current_range) if current_range else None
 
     meetings: list[dict[str, Any]] = []
     for item in meetings_raw:
         dist = item.get("distribution", [])
-        expected_rate_mid = 0.0
-        for row in dist:
-            mid = _rate_mid(row.get("rate_range", ""))
-            prob = float(row.get("prob", 0.0))
-            if mid is None:
-                continue
-            expected_rate_mid += mid * prob
+        probs = _probs_array(dist)
+        mids = _mids_array(dist)
+        valid = ~np.isnan(mids)
+        expected_rate_mid = float((mids[valid] * probs[valid]).sum())
 
         top = None
         if dist:
-            top = max(dist, key=lambda d: float(d.get("prob", 0.0)))
+            top = dist[int(probs.argmax())]
 
-        prob_groups = _compute_prob_groups(dist, current_range)
+        prob_groups = _compute_prob_groups(mids, probs, current_mid)
 
         meetings.append(
             {
@@ -143,7 +148,7 @@ def main() -> int:
     normalized["validation"] = {"ok": validation.ok, "issues": validation.issues}
 
     out_norm = run_dir / "normalized.json"
-    out_norm.write_text(json.dumps(normalized, indent=2, ensure_ascii=False), encoding="utf-8")
+    write_json(out_norm, normalized)
 
     if not validation.ok:
         return 1
@@ -1,33 +1,50 @@
 from __future__ import annotations
 
 import argparse
-import json
+import os
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+from _jsonio import read_json, write_json
+
 ART_DIR = Path("artifacts") / "fedwatch"
 LATEST_DIR = ART_DIR / "latest"
 HISTORY_DIR = ART_DIR / "history"
 
+_RUN_NAMES_CACHE: dict[Path, tuple[int, list[str]]] = {}
+
 
 def _iso_utc_now() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
 
+def _history_run_names() -> list[str]:
+    # cache รายชื่อ run dir ตาม mtime ของ HISTORY_DIR (เปลี่ยนเมื่อมี dir เพิ่ม/ลบ)
+    mtime_ns = HISTORY_DIR.stat().st_mtime_ns
+    cached = _RUN_NAMES_CACHE.get(HISTORY_DIR)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    with os.scandir(HISTORY_DIR) as entries:
+        names = [entry.name for entry in entries if not entry.name.startswith(".") and entry.is_dir()]
+    _RUN_NAMES_CACHE[HISTORY_DIR] = (mtime_ns, names)
+    return names
+
+
 def _find_previous_normalized(current_run_dir: Path) -> Path | None:
     if not HISTORY_DIR.exists():
         return None
 
-    candidates = sorted([p for p in HISTORY_DIR.glob("*/normalized.json")])
-    if not candidates:
-        return None
-
-    current_norm = current_run_dir / "normalized.json"
-    for path in reversed(candidates):
-        if path.resolve() != current_norm.resolve():
-            return path
-    return None
+    # หา run dir ชื่อมากสุด (ล่าสุด) ที่มี normalized.json และไม่ใช่ run ปัจจุบัน ด้วย linear scan แทน sort ทั้งหมด
+    current_norm = (current_run_dir / "normalized.json").resolve()
+    best = None
+    for name in _history_run_names():
+        if best is not None and name <= best:
+            continue
+        path = HISTORY_DIR / name / "normalized.json"
+        if path.is_file() and path.resolve() != current_norm:
+            best = name
+    return HISTORY_DIR / best / "normalized.json" if best is not None else None
 
 
 def _index_by_meeting(meetings: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
@@ -50,13 +67,13 @@ def main() -> int:
     if not current_path.exists():
         raise FileNotFoundError(f"Missing current normalized.json: {current_path.resolve()}")
 
-    current = json.loads(current_path.read_text(encoding="utf-8"))
+    current = read_json(current_path)
     current_meetings = current.get("meetings", [])
 
     previous_path = Path(args.previous) if args.previous else _find_previous_normalized(current_path.parent)
     previous = {}
     if previous_path and previous_path.exists():
-        previous = json.loads(previous_path.read_text(encoding="utf-8"))
+        previous = read_json(previous_path)
     previous_meetings = previous.get("meetings", [])
 
     current_index = _index_by_meeting(current_meetings)
@@ -86,14 +103,17 @@ def main() -> int:
 
             prev_dist = {d.get("rate_range"): float(d.get("prob", 0.0)) for d in prev.get("distribution", [])}
             cur_dist = {d.get("rate_range"): float(d.get("prob", 0.0)) for d in cur.get("distribution", [])}
-            all_ranges = sorted(set(prev_dist) | set(cur_dist))
-            for rate_range in all_ranges:
-                delta_entry["prob_shift"].append(
-                    {
-                        "rate_range": rate_range,
-                        "delta": cur_dist.get(rate_range, 0.0) - prev_dist.get(rate_range, 0.0),
-                    }
-                )
+            # merge ตามลำดับ distribution ปัจจุบัน แล้วต่อด้วย range ที่หายไป (ไม่ต้องสร้าง union set + sort)
+            prob_shift = [
+                {"rate_range": rate_range, "delta": prob - prev_dist.get(rate_range, 0.0)}
+                for rate_range, prob in cur_dist.items()
+            ]
+            prob_shift.extend(
+                {"rate_range": rate_range, "delta": 0.0 - prob}
+                for rate_range, prob in prev_dist.items()
+                if rate_range not in cur_dist
+            )
+            delta_entry["prob_shift"] = prob_shift
 
         deltas.append(delta_entry)
 
@@ -105,7 +125,7 @@ def main() -> int:
     }
 
     output_path = Path(args.output) if args.output else (current_path.parent / "delta.json")
-    output_path.write_text(json.dumps(out, indent=2, ensure_ascii=False), encoding="utf-8")
+    write_json(output_path, out)
 
     return 0
 
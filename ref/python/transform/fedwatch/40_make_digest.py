@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import argparse
-import json
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+from _jsonio import read_json, write_json
+
 ART_DIR = Path("artifacts") / "fedwatch"
 LATEST_DIR = ART_DIR / "latest"
 
@@ -23,11 +24,8 @@ def _format_percent(value: float | None) -> str:
 def _find_next_meeting(meetings: list[dict[str, Any]]) -> dict[str, Any] | None:
     if not meetings:
         return None
-    sorted_meetings = sorted(
-        meetings,
-        key=lambda meeting: meeting.get("meeting_date") or "",
-    )
-    return sorted_meetings[0]
+    # scan รอบเดียวหา meeting_date น้อยสุด (ไม่ต้อง sort ทั้ง list เพื่อเอาตัวแรก)
+    return min(meetings, key=lambda meeting: meeting.get("meeting_date") or "")
 
 
 def main() -> int:
@@ -43,10 +41,10 @@ def main() -> int:
     if not normalized_path.exists():
         raise FileNotFoundError(f"Missing normalized.json: {normalized_path.resolve()}")
 
-    normalized = json.loads(normalized_path.read_text(encoding="utf-8"))
+    normalized = read_json(normalized_path)
     delta = {}
     if delta_path.exists():
-        delta = json.loads(delta_path.read_text(encoding="utf-8"))
+        delta = read_json(delta_path)
 
     meetings = normalized.get("meetings", [])
     next_meeting = _find_next_meeting(meetings)
@@ -81,7 +79,7 @@ def main() -> int:
     }
 
     output_path = Path(args.output) if args.output else (normalized_path.parent / "digest.json")
-    output_path.write_text(json.dumps(output, indent=2, ensure_ascii=False), encoding="utf-8")
+    write_json(output_path, output)
 
     return 0
 
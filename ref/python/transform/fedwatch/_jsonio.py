@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback to stdlib json
+    orjson = None
+
+
+def write_json(path: Path, payload: Any) -> None:
+    # เขียนลง temp file แล้ว os.replace (ไม่ทิ้งไฟล์ครึ่งๆ ถ้าพังกลางทาง)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    if orjson is not None:
+        # orjson serialize เป็น bytes ทั้งก้อนใน C แล้ว write ครั้งเดียว
+        tmp.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        # stdlib: stream ลงไฟล์ตรงๆ ไม่สร้าง string ทั้งก้อน
+        with open(tmp, "w", encoding="utf-8", buffering=1 << 20) as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def read_json(path: Path) -> Any:
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_text(encoding="utf-8"))